@@ -3,10 +3,22 @@
 Advanced Analysis API Routes
 """
 
-from flask import Blueprint, jsonify, request
+import threading
+import time
+from decimal import Decimal
+from functools import wraps
+
+from flask import Blueprint, Response, current_app, jsonify, make_response, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from .profile_service import ProfileService
 from .joint_service import JointAnalysisService
-from .event_service import EventService
+from .event_service import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, EventService, decode_cursor
+)
 
 advanced_bp = Blueprint('advanced', __name__, url_prefix='/api/advanced')
 
@@ -16,56 +28,178 @@ joint_service = JointAnalysisService()
 event_service = EventService()
 
 
+def _json_default(obj):
+    """Fallback for types orjson does not serialize natively"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def orjson_response(obj, status=200):
+    """
+    Build a JSON response with orjson (numpy values and datetimes handled
+    natively); falls back to jsonify when orjson is not installed.
+    """
+    if orjson is None:
+        return jsonify(obj), status
+    body = orjson.dumps(
+        obj,
+        default=_json_default,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+    )
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
+def _page_args():
+    """
+    Read limit/cursor query params: limit is clamped to [1, MAX_PAGE_SIZE].
+    Returns (limit, after, error) where error is a 400 payload or None.
+    """
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return limit, None, None
+    try:
+        return limit, decode_cursor(cursor), None
+    except ValueError:
+        return limit, None, ({'error': 'Invalid cursor'}, 400)
+
+
+def _columnar():
+    """True when the client asked for column-oriented rows (?layout=columns)"""
+    return request.args.get('layout') == 'columns'
+
+
+def to_columns(rows):
+    """
+    Transpose a list of row dicts into {column: [values...]}.
+    Keys are taken from the first row (all rows come from one select).
+    """
+    if not rows:
+        return {}
+    return {k: [r.get(k) for r in rows] for k in rows[0]}
+
+
+def json_endpoint(fn):
+    """
+    Serialize a view's return value as JSON.
+    Views return a payload or a (payload, status) tuple; any exception
+    becomes {'error': ...} with status 500.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            return orjson_response({'error': str(e)}, 500)
+        if isinstance(result, Response):
+            return result
+        if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], int):
+            payload, status = result
+            return orjson_response(payload, status)
+        return orjson_response(result)
+    return wrapper
+
+
+# In-process cache for read-mostly GET endpoints:
+# (path, whitelisted query args...) -> (expires_at, body, mimetype, etag)
+_response_cache = {}
+_response_cache_lock = threading.Lock()
+RESPONSE_CACHE_MAXSIZE = 128
+
+
+def cached_get(timeout=300, args=()):
+    """
+    Cache successful GET responses for `timeout` seconds and mark them
+    cacheable for clients (Cache-Control + ETag, answering If-None-Match
+    with 304).
+
+    The key is the request path plus only the query params named in `args`,
+    so unrelated query strings share one entry. At most
+    RESPONSE_CACHE_MAXSIZE entries are kept: expired ones are evicted
+    first, then the oldest.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*fn_args, **kwargs):
+            key = (request.path,) + tuple(request.args.get(name) for name in args)
+            now = time.time()
+            entry = _response_cache.get(key)
+            if entry and entry[0] > now:
+                _, body, mimetype, etag = entry
+                resp = Response(body, mimetype=mimetype)
+                resp.set_etag(etag)
+            else:
+                resp = make_response(fn(*fn_args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+                resp.add_etag()
+                etag, _ = resp.get_etag()
+                with _response_cache_lock:
+                    _response_cache.pop(key, None)
+                    if len(_response_cache) >= RESPONSE_CACHE_MAXSIZE:
+                        for k in [k for k, v in _response_cache.items() if v[0] <= now]:
+                            del _response_cache[k]
+                    while len(_response_cache) >= RESPONSE_CACHE_MAXSIZE:
+                        _response_cache.pop(next(iter(_response_cache)))
+                    _response_cache[key] = (now + timeout, resp.get_data(), resp.mimetype, etag)
+            resp.headers['Cache-Control'] = f'public, max-age={timeout}'
+            return resp.make_conditional(request)
+        return wrapper
+    return decorator
+
+
 # =====================================================
 # Profile APIs
 # =====================================================
 
 @advanced_bp.route('/profile/config', methods=['GET'])
+@cached_get()
+@json_endpoint
 def get_profile_config():
     """Get tunnel profile configuration (point -> chainage mapping)"""
-    try:
-        config = profile_service.get_profile_config()
-        return jsonify(config)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return profile_service.get_profile_config()
 
 
 @advanced_bp.route('/profile/layers', methods=['GET'])
+@cached_get()
+@json_endpoint
 def get_geological_layers():
     """Get geological layers for profile background"""
-    try:
-        layers = profile_service.get_geological_layers()
-        return jsonify(layers)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return profile_service.get_geological_layers()
 
 
 @advanced_bp.route('/profile/data', methods=['GET'])
+@cached_get(args=('date', 'layout'))
+@json_endpoint
 def get_profile_data():
     """
     Get profile data for a specific date
     Query params:
         - date: YYYY-MM-DD (optional, defaults to latest)
+        - layout: 'columns' for {column: [values]} instead of row objects
     """
-    try:
-        date = request.args.get('date')
-        data = profile_service.get_profile_data(date)
-        return jsonify(data)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    date = request.args.get('date')
+    result = profile_service.get_profile_data(date)
+    if _columnar():
+        result = {**result, 'profile': to_columns(result['profile'])}
+    return result
 
 
 @advanced_bp.route('/profile/dates', methods=['GET'])
+@cached_get()
+@json_endpoint
 def get_available_dates():
     """Get list of available dates for profile visualization"""
-    try:
-        dates = profile_service.get_available_dates()
-        return jsonify({'dates': dates})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    dates = profile_service.get_available_dates()
+    return {'dates': dates}
 
 
 @advanced_bp.route('/profile/animation', methods=['GET'])
+@json_endpoint
 def get_profile_animation():
     """
     Get profile data for animation
@@ -74,28 +208,22 @@ def get_profile_animation():
         - end: End date YYYY-MM-DD
         - interval: Days between frames (default 7)
     """
-    try:
-        start = request.args.get('start')
-        end = request.args.get('end')
-        interval = int(request.args.get('interval', 7))
+    start = request.args.get('start')
+    end = request.args.get('end')
+    interval = int(request.args.get('interval', 7))
 
-        if not start or not end:
-            return jsonify({'error': 'start and end dates required'}), 400
+    if not start or not end:
+        return {'error': 'start and end dates required'}, 400
 
-        frames = profile_service.get_profile_animation_data(start, end, interval)
-        return jsonify({'frames': frames})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    frames = profile_service.get_profile_animation_data(start, end, interval)
+    return {'frames': frames}
 
 
 @advanced_bp.route('/profile/statistics', methods=['GET'])
+@json_endpoint
 def get_profile_statistics():
     """Get summary statistics for the profile"""
-    try:
-        stats = profile_service.get_profile_statistics()
-        return jsonify(stats)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return profile_service.get_profile_statistics()
 
 
 # =====================================================
@@ -103,53 +231,66 @@ def get_profile_statistics():
 # =====================================================
 
 @advanced_bp.route('/joint/mapping', methods=['GET'])
+@cached_get()
+@json_endpoint
 def get_joint_mapping():
     """Get settlement-crack point mapping"""
-    try:
-        mapping = joint_service.get_mapping()
-        return jsonify(mapping)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return joint_service.get_mapping()
 
 
 @advanced_bp.route('/joint/data/<settlement_point>', methods=['GET'])
+@json_endpoint
 def get_joint_data(settlement_point):
-    """Get joint time series for a settlement point and related cracks"""
-    try:
-        data = joint_service.get_joint_time_series(settlement_point)
-        return jsonify(data)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    """
+    Get joint time series for a settlement point and related cracks
+    Query params:
+        - layout: 'columns' for {column: [values]} instead of row objects
+    """
+    result = joint_service.get_joint_time_series(settlement_point)
+    if _columnar():
+        result = {
+            **result,
+            'settlement_data': to_columns(result['settlement_data']),
+            'related_cracks': [{**c, 'data': to_columns(c['data'])} for c in result['related_cracks']],
+        }
+    return result
 
 
 @advanced_bp.route('/joint/correlation/<settlement_point>', methods=['GET'])
+@json_endpoint
 def get_joint_correlation(settlement_point):
     """Analyze correlation between settlement and crack changes"""
-    try:
-        analysis = joint_service.analyze_correlation(settlement_point)
-        return jsonify(analysis)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return joint_service.analyze_correlation(settlement_point)
+
+
+@advanced_bp.route('/joint/correlation', methods=['GET'])
+@json_endpoint
+def get_joint_correlation_bulk():
+    """
+    Analyze correlation for several settlement points in one request
+    Query params:
+        - points: Comma-separated settlement points (default: all mapped points)
+    """
+    points = [p for p in request.args.get('points', '').split(',') if p]
+    if not points:
+        points = [m['settlement_point'] for m in joint_service.get_mapping()]
+    return joint_service.analyze_correlation_bulk(points)
 
 
 @advanced_bp.route('/joint/alerts', methods=['GET'])
+@json_endpoint
 def get_joint_alerts():
     """Get joint alerts where both settlement and crack are abnormal"""
-    try:
-        alerts = joint_service.get_joint_alerts()
-        return jsonify({'alerts': alerts, 'count': len(alerts)})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    alerts = joint_service.get_joint_alerts()
+    return {'alerts': alerts, 'count': len(alerts)}
 
 
 @advanced_bp.route('/joint/summary', methods=['GET'])
+@cached_get()
+@json_endpoint
 def get_joint_summary():
     """Get summary of joint analysis data"""
-    try:
-        summary = joint_service.get_summary()
-        return jsonify(summary)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return joint_service.get_summary()
 
 
 # =====================================================
@@ -157,16 +298,16 @@ def get_joint_summary():
 # =====================================================
 
 @advanced_bp.route('/events/types', methods=['GET'])
+@cached_get()
+@json_endpoint
 def get_event_types():
     """Get available event types"""
-    try:
-        types = event_service.get_event_types()
-        return jsonify(types)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    # Read-only mappings are thawed here; cached_get keeps this off the hot path
+    return [dict(t) for t in event_service.get_event_types()]
 
 
 @advanced_bp.route('/events', methods=['GET'])
+@json_endpoint
 def list_events():
     """
     List construction events
@@ -174,118 +315,110 @@ def list_events():
         - start: Start date filter
         - end: End date filter
         - type: Event type filter
+        - limit: Page size (default 100, max 500)
+        - cursor: next_cursor from the previous page
     """
-    try:
-        start = request.args.get('start')
-        end = request.args.get('end')
-        event_type = request.args.get('type')
-
-        events = event_service.list_events(
-            start_date=start,
-            end_date=end,
-            event_type=event_type
-        )
-        return jsonify({'events': events, 'count': len(events)})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    start = request.args.get('start')
+    end = request.args.get('end')
+    event_type = request.args.get('type')
+    limit, after, error = _page_args()
+    if error:
+        return error
+
+    events, next_cursor = event_service.list_events_page(
+        start_date=start,
+        end_date=end,
+        event_type=event_type,
+        limit=limit,
+        after=after
+    )
+    return {'events': events, 'count': len(events), 'next_cursor': next_cursor}
 
 
 @advanced_bp.route('/events/<int:event_id>', methods=['GET'])
+@json_endpoint
 def get_event(event_id):
     """Get a single event by ID"""
-    try:
-        event = event_service.get_event(event_id)
-        if not event:
-            return jsonify({'error': 'Event not found'}), 404
-        return jsonify(event)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    event = event_service.get_event(event_id)
+    if not event:
+        return {'error': 'Event not found'}, 404
+    return event
 
 
 @advanced_bp.route('/events', methods=['POST'])
+@json_endpoint
 def create_event():
     """Create a new construction event"""
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
+    data = request.get_json()
+    if not data:
+        return {'error': 'No data provided'}, 400
 
-        required = ['event_date', 'event_type', 'title']
-        for field in required:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+    required = ['event_date', 'event_type', 'title']
+    for field in required:
+        if field not in data:
+            return {'error': f'Missing required field: {field}'}, 400
 
-        event = event_service.create_event(data)
-        return jsonify(event), 201
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    event = event_service.create_event(data)
+    return event, 201
 
 
 @advanced_bp.route('/events/<int:event_id>', methods=['PUT', 'PATCH'])
+@json_endpoint
 def update_event(event_id):
     """Update an existing event"""
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
+    data = request.get_json()
+    if not data:
+        return {'error': 'No data provided'}, 400
 
-        event = event_service.update_event(event_id, data)
-        return jsonify(event)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return event_service.update_event(event_id, data)
 
 
 @advanced_bp.route('/events/<int:event_id>', methods=['DELETE'])
+@json_endpoint
 def delete_event(event_id):
     """Delete an event"""
-    try:
-        event_service.delete_event(event_id)
-        return jsonify({'success': True})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    event_service.delete_event(event_id)
+    return {'success': True}
 
 
 @advanced_bp.route('/events/<int:event_id>/impact', methods=['GET'])
+@json_endpoint
 def analyze_event_impact(event_id):
     """
     Analyze the impact of a construction event on settlement
     Query params:
         - window: Analysis window in hours (default 72)
     """
-    try:
-        window = request.args.get('window', type=int)
-        analysis = event_service.analyze_event_impact(event_id, window)
-        return jsonify(analysis)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    window = request.args.get('window', type=int)
+    return event_service.analyze_event_impact(event_id, window)
 
 
 @advanced_bp.route('/events/timeline', methods=['GET'])
+@json_endpoint
 def get_events_timeline():
     """
     Get events for timeline overlay
     Query params:
         - start: Start date
         - end: End date
+        - limit: Page size (default 100, max 500)
+        - cursor: next_cursor from the previous page
     """
-    try:
-        start = request.args.get('start')
-        end = request.args.get('end')
+    start = request.args.get('start')
+    end = request.args.get('end')
 
-        if not start or not end:
-            return jsonify({'error': 'start and end dates required'}), 400
+    if not start or not end:
+        return {'error': 'start and end dates required'}, 400
+    limit, after, error = _page_args()
+    if error:
+        return error
 
-        timeline = event_service.get_events_for_timeline(start, end)
-        return jsonify({'events': timeline})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    timeline, next_cursor = event_service.get_events_for_timeline_page(start, end, limit=limit, after=after)
+    return {'events': timeline, 'next_cursor': next_cursor}
 
 
 @advanced_bp.route('/events/summary', methods=['GET'])
+@json_endpoint
 def get_events_summary():
     """Get summary of construction events"""
-    try:
-        summary = event_service.get_summary()
-        return jsonify(summary)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return event_service.get_summary()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Small in-process caches for quasi-static Supabase tables
+"""
+
+import threading
+import time
+from functools import wraps
+
+
+def ttl_cache(seconds=300, maxsize=128):
+    """
+    Memoize a function (or method) for `seconds`, keyed on its arguments.
+
+    Cached values are shared between callers and must be treated as
+    read-only. The wrapped function gets a cache_clear() to drop entries
+    early, e.g. after re-importing data.
+    """
+    def decorator(fn):
+        # key -> (fetched_at, value)
+        cache = {}
+        lock = threading.Lock()
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+            entry = cache.get(key)
+            now = time.monotonic()
+            if entry and now - entry[0] < seconds:
+                return entry[1]
+            value = fn(*args, **kwargs)
+            with lock:
+                if key not in cache and len(cache) >= maxsize:
+                    cache.pop(next(iter(cache)))
+                cache[key] = (now, value)
+            return value
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
@@ -7,10 +7,65 @@ Imports:
 3. Crack monitoring data
 """
 
+import importlib.util
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import requests
-import pandas as pd
-from docx import Document
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Per-record logging; enabled with --verbose
+VERBOSE = False
+
+# Concurrent requests for batch uploads (also the connection pool size)
+MAX_WORKERS = 8
+
+# Prefer header for bulk upserts: skip echoing the rows back
+UPSERT_PREFER = 'return=minimal,resolution=merge-duplicates'
+
+
+def _build_session():
+    """
+    Shared session so all imports reuse keep-alive connections.
+    Gateway errors are retried with backoff (Retry-After is honoured) for
+    idempotent methods only: a POST may already have been committed when a
+    502/504 comes back, and plain inserts would then be duplicated.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+SESSION = _build_session()
+
+
+def _dumps(rows):
+    """Serialize a request body to JSON bytes (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(rows)
+    return json.dumps(rows, ensure_ascii=False).encode('utf-8')
+
+
+def _log(msg):
+    if VERBOSE:
+        print(msg)
+
 
 def _headers():
     anon = os.environ.get('SUPABASE_ANON_KEY', '')
@@ -28,64 +83,142 @@ def _url(path):
     return f'{base}{path}'
 
 
-def import_profile_config():
+def _refresh_env():
+    """
+    Precompute request headers and endpoint URLs from the environment.
+    Called once at import; call again after changing SUPABASE_* variables.
+    """
+    global _HEADERS, _HEADERS_INSERT, _HEADERS_UPSERT
+    global _PROFILE_URL, _LAYERS_URL, _MAPPING_URL, _CRACK_URL
+    headers = _headers()
+    _HEADERS = headers
+    _HEADERS_INSERT = {**headers, 'Prefer': 'return=minimal'}
+    _HEADERS_UPSERT = {**headers, 'Prefer': UPSERT_PREFER}
+    _PROFILE_URL = _url('/rest/v1/tunnel_profile_config?on_conflict=point_id')
+    _LAYERS_URL = _url('/rest/v1/geological_layers')
+    _MAPPING_URL = _url('/rest/v1/settlement_crack_mapping?on_conflict=settlement_point,crack_point')
+    _CRACK_URL = _url('/rest/v1/crack_monitoring_data')
+
+
+_refresh_env()
+
+
+def _post_one(url, rows, headers=None):
+    """
+    POST one batch; returns None on success or the exception on failure
+    so that concurrent callers can report per-batch results.
+    """
+    try:
+        _post_rows(url, rows, headers)
+        return None
+    except Exception as e:
+        return e
+
+
+def _post_rows(url, rows, headers=None):
+    """
+    POST a list of rows as a single JSON array (PostgREST bulk insert/upsert).
+    If the payload is rejected as too large (413), split it in half and retry.
+    Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+    headers = headers or _HEADERS_INSERT
+    r = SESSION.post(url, headers=headers, data=_dumps(rows))
+    if r.status_code == 413 and len(rows) > 1:
+        mid = len(rows) // 2
+        return _post_rows(url, rows[:mid], headers) + _post_rows(url, rows[mid:], headers)
+    r.raise_for_status()
+    return len(rows)
+
+
+def _upsert_rows(rpc_name, url, rows, headers=None):
+    """
+    Bulk upsert rows through a SQL function (one set-based statement,
+    see supabase/sql/08_advanced_analysis_rpc.sql). Falls back to a REST
+    array POST on `url` when the function is not deployed (404).
+    Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+    r = SESSION.post(_url(f'/rest/v1/rpc/{rpc_name}'), headers=_HEADERS, data=_dumps({'payload': rows}))
+    if r.status_code == 404:
+        return _post_rows(url, rows, headers)
+    r.raise_for_status()
+    return len(rows)
+
+
+def _existing_keys(table, keys):
+    """
+    Natural keys already stored in a seed table, as a set of tuples.
+    Returns an empty set if the lookup fails, so every row gets posted.
+    """
+    try:
+        r = SESSION.get(_url(f"/rest/v1/{table}?select={','.join(keys)}"), headers=_HEADERS)
+        r.raise_for_status()
+        return {tuple(row.get(k) for k in keys) for row in r.json()}
+    except Exception:
+        return set()
+
+
+def _missing_rows(table, rows, keys):
+    """Rows whose natural key is not yet present in the table"""
+    existing = _existing_keys(table, keys)
+    return [row for row in rows if tuple(row[k] for k in keys) not in existing]
+
+
+def import_profile_config(force=False):
     """
     Import settlement point -> chainage mapping
     Assumes uniform distribution along 565m tunnel
+    Only points not yet in the table are sent unless force=True.
     """
     tunnel_length = 565.0  # meters
-    points = []
+    n_points = 26
 
     # S0-S25: 26 points uniformly distributed
-    for i in range(26):
-        point_id = f'S{i}'
-        chainage = (i / 25) * tunnel_length
-        points.append({
-            'point_id': point_id,
+    chainages = np.linspace(0.0, tunnel_length, n_points).tolist()
+    points = [
+        {
+            'point_id': f'S{i}',
             'chainage_m': round(chainage, 2),
             'section_name': f'Section {i}',
-            'description': f'Settlement monitoring point {point_id}'
-        })
+            'description': f'Settlement monitoring point S{i}'
+        }
+        for i, chainage in enumerate(chainages)
+    ]
 
-    # Also handle special points with left/right variants
+    # Also handle special points with left/right variants:
+    # left slightly before, right slightly after the base point
     special_points = ['S6', 'S11', 'S13', 'S16', 'S18']
-    for sp in special_points:
-        base_idx = int(sp[1:])
-        base_chainage = (base_idx / 25) * tunnel_length
-        # Left variant (slightly before)
-        points.append({
-            'point_id': f'{sp}L',
-            'chainage_m': round(base_chainage - 1, 2),
-            'section_name': f'Section {base_idx} Left',
-            'description': f'Settlement monitoring point {sp} Left side'
-        })
-        # Right variant (slightly after)
-        points.append({
-            'point_id': f'{sp}R',
-            'chainage_m': round(base_chainage + 1, 2),
-            'section_name': f'Section {base_idx} Right',
-            'description': f'Settlement monitoring point {sp} Right side'
-        })
-
-    # Upsert to Supabase
-    for p in points:
-        try:
-            r = requests.post(
-                _url('/rest/v1/tunnel_profile_config?on_conflict=point_id'),
-                headers={**_headers(), 'Prefer': 'return=representation,resolution=merge-duplicates'},
-                json=p
-            )
-            r.raise_for_status()
-            print(f"[OK] Imported {p['point_id']} at {p['chainage_m']}m")
-        except Exception as e:
-            print(f"[ERROR] Failed to import {p['point_id']}: {e}")
+    points += [
+        {
+            'point_id': f'{sp}{side}',
+            'chainage_m': round(chainages[int(sp[1:])] + offset, 2),
+            'section_name': f'Section {sp[1:]} {label}',
+            'description': f'Settlement monitoring point {sp} {label} side'
+        }
+        for sp in special_points
+        for side, label, offset in (('L', 'Left', -1), ('R', 'Right', 1))
+    ]
+
+    # Upsert to Supabase in a single request
+    try:
+        new_points = points if force else _missing_rows('tunnel_profile_config', points, ('point_id',))
+        n = _upsert_rows('upsert_tunnel_profile_config', _PROFILE_URL, new_points, _HEADERS_UPSERT)
+        for p in new_points:
+            _log(f"[OK] Imported {p['point_id']} at {p['chainage_m']}m")
+        print(f"[OK] Imported {n} profile points ({len(points) - n} already present)")
+    except Exception as e:
+        print(f"[ERROR] Failed to import profile config: {e}")
 
     return points
 
 
-def import_geological_layers(docx_path=None):
+def import_geological_layers(docx_path=None, force=False):
     """
     Import geological layer data from docx or use default values
+    Layers already in the table (by layer_number) are skipped unless force=True.
     """
     # Default geological layers from the document
     layers = [
@@ -115,107 +248,123 @@ def import_geological_layers(docx_path=None):
          'compression_modulus': 11, 'poisson_ratio': 0.36, 'color': '#DEB887'},
     ]
 
-    for layer in layers:
-        try:
-            r = requests.post(
-                _url('/rest/v1/geological_layers'),
-                headers=_headers(),
-                json=layer
-            )
-            r.raise_for_status()
-            print(f"[OK] Imported layer {layer['layer_number']}: {layer['layer_name']}")
-        except Exception as e:
-            print(f"[ERROR] Failed to import layer {layer['layer_number']}: {e}")
+    try:
+        new_layers = layers if force else _missing_rows('geological_layers', layers, ('layer_number',))
+        n = _upsert_rows('upsert_geological_layers', _LAYERS_URL, new_layers)
+        for layer in new_layers:
+            _log(f"[OK] Imported layer {layer['layer_number']}: {layer['layer_name']}")
+        print(f"[OK] Imported {n} geological layers ({len(layers) - n} already present)")
+    except Exception as e:
+        print(f"[ERROR] Failed to import geological layers: {e}")
 
     return layers
 
 
+def _open_workbook(path):
+    """
+    Open an Excel workbook, preferring the Rust-based calamine reader
+    (pandas >= 2.2 with python-calamine installed) over openpyxl.
+    """
+    # pandas is only needed for the crack data import
+    import pandas as pd
+
+    if importlib.util.find_spec('python_calamine') is not None:
+        try:
+            return pd.ExcelFile(path, engine='calamine')
+        except ValueError:
+            pass
+    return pd.ExcelFile(path)
+
+
+def _score_crack_sheet(name, columns):
+    """
+    Rank how likely a sheet holds crack monitoring data (higher wins, ties go
+    to the earlier sheet; 0 means not a crack sheet):
+    3 if it has an F1-1/F1-2 column, else 2 for a crack/fissure sheet name,
+    else 1 if it has more than 10 F*-* columns.
+    """
+    if any('F1-1' in str(c) or 'F1-2' in str(c) for c in columns):
+        return 3
+    if 'crack' in name.lower() or 'fissure' in name.lower():
+        return 2
+    if sum(1 for c in columns if str(c).startswith('F') and '-' in str(c)) > 10:
+        return 1
+    return 0
+
+
 def import_crack_data(excel_path):
     """
     Import crack monitoring data from Excel
     """
     try:
-        df = pd.read_excel(excel_path, sheet_name=None)
+        xl = _open_workbook(excel_path)
+        # Only read header rows while looking for the crack sheet
+        sheets = {name: xl.parse(name, nrows=0).columns.tolist() for name in xl.sheet_names}
 
-        # Find the crack data sheet
+        # Find the crack data sheet: score every sheet in a single pass
         crack_sheet = None
-        for name in df.keys():
-            if 'crack' in name.lower() or 'fissure' in name.lower():
-                crack_sheet = name
-                break
-
-        # Try sheet with F1-1, F1-2 pattern
-        for name, sheet_df in df.items():
-            cols = sheet_df.columns.tolist()
-            if any('F1-1' in str(c) or 'F1-2' in str(c) for c in cols):
-                crack_sheet = name
-                break
-
-        if not crack_sheet:
-            # Use the sheet with most F columns
-            for name, sheet_df in df.items():
-                cols = [str(c) for c in sheet_df.columns]
-                f_cols = [c for c in cols if c.startswith('F') and '-' in c]
-                if len(f_cols) > 10:
-                    crack_sheet = name
-                    break
+        scores = {name: _score_crack_sheet(name, cols) for name, cols in sheets.items()}
+        if scores:
+            best = max(scores, key=scores.get)
+            if scores[best] > 0:
+                crack_sheet = best
 
         if not crack_sheet:
             print("[WARNING] No crack data sheet found")
             return []
 
-        crack_df = df[crack_sheet]
+        header = sheets[crack_sheet]
         print(f"[INFO] Using sheet: {crack_sheet}")
-        print(f"[INFO] Columns: {crack_df.columns.tolist()[:10]}...")
+        print(f"[INFO] Columns: {header[:10]}...")
 
         # Find date column
-        date_col = None
-        for col in crack_df.columns:
+        date_idx = 0
+        for idx, col in enumerate(header):
             col_str = str(col).lower()
             if 'date' in col_str or 'time' in col_str:
-                date_col = col
+                date_idx = idx
                 break
-        if not date_col:
-            date_col = crack_df.columns[0]
 
         # Get crack point columns (F1-1, F1-2, etc.)
-        crack_cols = [c for c in crack_df.columns if str(c).startswith('F') and '-' in str(c)]
-
-        records = []
-        for _, row in crack_df.iterrows():
-            date_val = row[date_col]
-            if pd.isna(date_val):
-                continue
-
-            for col in crack_cols:
-                value = row[col]
-                if pd.isna(value):
-                    continue
-
-                point_id = str(col)
-                crack_id = point_id.split('-')[0] if '-' in point_id else point_id
-
-                records.append({
-                    'measurement_date': str(date_val),
-                    'point_id': point_id,
-                    'crack_id': crack_id,
-                    'value': float(value)
-                })
-
-        # Batch insert
-        batch_size = 100
-        for i in range(0, len(records), batch_size):
-            batch = records[i:i+batch_size]
-            try:
-                r = requests.post(
-                    _url('/rest/v1/crack_monitoring_data'),
-                    headers=_headers(),
-                    json=batch
-                )
-                r.raise_for_status()
-                print(f"[OK] Imported batch {i//batch_size + 1}: {len(batch)} records")
-            except Exception as e:
-                print(f"[ERROR] Failed to import batch: {e}")
+        crack_idx = [idx for idx, c in enumerate(header)
+                     if str(c).startswith('F') and '-' in str(c) and idx != date_idx]
+
+        # Load only the date and crack point columns of the chosen sheet
+        crack_df = xl.parse(crack_sheet, usecols=sorted([date_idx] + crack_idx))
+        date_col = header[date_idx]
+        crack_cols = [header[idx] for idx in crack_idx]
+
+        # Wide -> long: keep only cells with both a date and a value.
+        # Null checks run as one vectorized mask; rows stay in sheet order.
+        values = crack_df[crack_cols]
+        valid = values.notna().to_numpy() & crack_df[date_col].notna().to_numpy()[:, None]
+        ii, jj = valid.nonzero()
+        dates = crack_df[date_col].map(str).tolist()
+        point_ids = [str(c) for c in crack_cols]
+        crack_ids = [p.split('-')[0] for p in point_ids]
+        cells = values.to_numpy()[ii, jj].tolist()
+        records = [
+            {
+                'measurement_date': dates[i],
+                'point_id': point_ids[j],
+                'crack_id': crack_ids[j],
+                'value': float(v)
+            }
+            for i, j, v in zip(ii.tolist(), jj.tolist(), cells)
+        ]
+
+        # Batch insert, batches sent concurrently over the shared session
+        batch_size = 1000
+        batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            results = list(pool.map(
+                lambda batch: _post_one(_CRACK_URL, batch), batches
+            ))
+        for idx, (batch, err) in enumerate(zip(batches, results), start=1):
+            if err is None:
+                print(f"[OK] Imported batch {idx}: {len(batch)} records")
+            else:
+                print(f"[ERROR] Failed to import batch {idx}: {err}")
 
         return records
 
@@ -224,10 +373,11 @@ def import_crack_data(excel_path):
         return []
 
 
-def import_settlement_crack_mapping():
+def import_settlement_crack_mapping(force=False):
     """
     Create mapping between settlement points and crack points
     Based on assumed spatial proximity
+    Existing (settlement_point, crack_point) pairs are skipped unless force=True.
     """
     # Design mapping: assume cracks F1-F11 are distributed along tunnel
     # S0-S25 = 26 points, F1-F11 = 11 cracks
@@ -285,37 +435,37 @@ def import_settlement_crack_mapping():
         {'settlement_point': 'S24', 'crack_point': 'F11-3', 'distance_m': 6, 'correlation_strength': 'medium'},
     ]
 
-    for m in mappings:
-        try:
-            r = requests.post(
-                _url('/rest/v1/settlement_crack_mapping?on_conflict=settlement_point,crack_point'),
-                headers={**_headers(), 'Prefer': 'return=representation,resolution=merge-duplicates'},
-                json=m
-            )
-            r.raise_for_status()
-            print(f"[OK] Mapped {m['settlement_point']} -> {m['crack_point']}")
-        except Exception as e:
-            print(f"[ERROR] Failed to map: {e}")
+    try:
+        new_mappings = mappings if force else _missing_rows(
+            'settlement_crack_mapping', mappings, ('settlement_point', 'crack_point')
+        )
+        n = _upsert_rows('upsert_settlement_crack_mapping', _MAPPING_URL, new_mappings, _HEADERS_UPSERT)
+        for m in new_mappings:
+            _log(f"[OK] Mapped {m['settlement_point']} -> {m['crack_point']}")
+        print(f"[OK] Imported {n} settlement-crack mappings ({len(mappings) - n} already present)")
+    except Exception as e:
+        print(f"[ERROR] Failed to import mappings: {e}")
 
     return mappings
 
 
-def run_all_imports(crack_excel_path=None):
+def run_all_imports(crack_excel_path=None, force=False):
     """
     Run all data imports
+    force=True re-sends seed rows that already exist
     """
     print("=" * 60)
     print("Starting Advanced Analysis Data Import")
     print("=" * 60)
 
     print("\n[1/4] Importing tunnel profile config...")
-    import_profile_config()
+    import_profile_config(force=force)
 
     print("\n[2/4] Importing geological layers...")
-    import_geological_layers()
+    import_geological_layers(force=force)
 
     print("\n[3/4] Importing settlement-crack mapping...")
-    import_settlement_crack_mapping()
+    import_settlement_crack_mapping(force=force)
 
     if crack_excel_path:
         print("\n[4/4] Importing crack monitoring data...")
@@ -330,5 +480,7 @@ def run_all_imports(crack_excel_path=None):
 
 if __name__ == '__main__':
     import sys
-    crack_path = sys.argv[1] if len(sys.argv) > 1 else None
-    run_all_imports(crack_path)
+    VERBOSE = '--verbose' in sys.argv
+    args = [a for a in sys.argv[1:] if a not in ('--verbose', '--force')]
+    crack_path = args[0] if args else None
+    run_all_imports(crack_path, force='--force' in sys.argv)
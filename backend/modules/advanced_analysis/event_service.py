@@ -3,45 +3,257 @@
 Event Service - Construction event management and impact analysis
 """
 
+import base64
+import json
 import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional, Tuple
+from urllib.parse import quote, urlencode
+
 import requests
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Event listing endpoint and fixed query params (newest first, id tiebreak)
+_EVENTS_PATH = '/rest/v1/construction_events'
+_EVENT_LIST_PARAMS = (('select', '*'), ('order', 'event_date.desc,event_id.desc'))
+
+# Page size limits for event listings
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+# Supabase base URL and read headers, resolved once on first use (not at
+# import, so the app has loaded its environment by then) and reused after
+_supabase = None
+
+
+def _supabase_config():
+    global _supabase
+    if _supabase is None:
+        anon = os.environ.get('SUPABASE_ANON_KEY', '')
+        h = {
+            'apikey': anon,
+            'Accept': 'application/json',
+        }
+        if anon:
+            h['Authorization'] = f'Bearer {anon}'
+        _supabase = (os.environ.get('SUPABASE_URL', '').rstrip('/'), h)
+    return _supabase
 
 
 def _headers():
-    anon = os.environ.get('SUPABASE_ANON_KEY', '')
-    h = {
-        'apikey': anon,
-        'Accept': 'application/json',
-    }
-    if anon:
-        h['Authorization'] = f'Bearer {anon}'
-    return h
+    """Shared read headers; copy before adding per-request entries"""
+    return _supabase_config()[1]
 
 
 def _post_headers():
-    h = _headers()
+    h = dict(_headers())
     h['Content-Type'] = 'application/json'
     h['Prefer'] = 'return=representation'
     return h
 
 
 def _url(path):
-    base = os.environ.get('SUPABASE_URL', '').rstrip('/')
-    return f'{base}{path}'
+    return _supabase_config()[0] + path
+
+
+def _loads(content):
+    """Decode a Supabase response body (orjson when available)"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _dumps(obj):
+    """Serialize a request body to JSON bytes (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
 
+# Shared session: keep-alive connections to Supabase are reused across calls
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=64))
 
-def _safe_request(url, headers):
-    """Make a request and return empty list on error"""
+# (connect, read) timeout for Supabase GETs
+_TIMEOUT = (3, 10)
+
+# Rows per Range page for multi-point queries (Supabase's default max-rows;
+# anything past the server cap would otherwise be dropped silently)
+FETCH_PAGE_SIZE = 1000
+
+# Concurrent Supabase queries. One bounded executor is shared by all
+# requests instead of spawning threads per call.
+_MAX_WORKERS = 16
+_EXECUTOR = ThreadPoolExecutor(max_workers=_MAX_WORKERS, thread_name_prefix='event-io')
+
+
+# Short-lived cache of successful GETs, keyed on URL. Writes bump the
+# generation so that changes are visible immediately.
+_GET_CACHE_TTL = 30
+_GET_CACHE_MAXSIZE = 512
+_get_cache = {}
+_get_cache_lock = threading.Lock()
+_generation = 0
+
+
+def _invalidate_cache():
+    """Drop cached GETs after a write"""
+    global _generation
+    with _get_cache_lock:
+        _generation += 1
+        _get_cache.clear()
+
+
+# Sorted index of all events for timeline slices:
+# (generation, built_at, dates, keys, rows, raw_dates), ascending by (event_date, event_id).
+# raw_dates are the stored event_date strings, used for exact page cursors.
+# Rebuilt after _TIMELINE_TTL seconds or when a write bumps the generation.
+_TIMELINE_TTL = 60
+_timeline_index = None
+
+
+# Last ETag and body per URL for conditional GETs. Unlike _get_cache this
+# survives writes: the server decides whether the body is still current.
+_etags = {}
+
+
+def _safe_request(url, headers, revalidate=False):
+    """
+    Make a request and return empty list on error
+
+    revalidate=True sends If-None-Match with the last ETag seen for this URL
+    and reuses the previous body on 304 (for listings that callers poll).
+    """
+    key = (_generation, url)
+    now = time.monotonic()
+    entry = _get_cache.get(key)
+    if entry and entry[0] > now:
+        return entry[1]
+    validator = _etags.get(url) if revalidate else None
+    if validator:
+        headers = {**headers, 'If-None-Match': validator[0]}
     try:
-        r = requests.get(url, headers=headers)
-        if r.status_code == 404 or r.status_code >= 500:
-            return []
-        r.raise_for_status()
-        return r.json()
+        r = _SESSION.get(url, headers=headers, timeout=_TIMEOUT)
+        if r.status_code == 304 and validator:
+            data = validator[1]
+        else:
+            if r.status_code == 404 or r.status_code >= 500:
+                return []
+            r.raise_for_status()
+            data = _loads(r.content)
+            etag = r.headers.get('ETag')
+            if revalidate and etag:
+                with _get_cache_lock:
+                    if url not in _etags and len(_etags) >= _GET_CACHE_MAXSIZE:
+                        _etags.pop(next(iter(_etags)))
+                    _etags[url] = (etag, data)
     except Exception:
         return []
+    with _get_cache_lock:
+        if key[0] == _generation:
+            if len(_get_cache) >= _GET_CACHE_MAXSIZE:
+                _get_cache.pop(next(iter(_get_cache)))
+            _get_cache[key] = (now + _GET_CACHE_TTL, data)
+    return data
+
+
+# Impact level by |rate change| (mm/day): above 0.02 low, 0.05 medium, 0.1 high
+_THRESH = (0.02, 0.05, 0.1)
+_LEVELS = ('none', 'low', 'medium', 'high')
+
+# Sort rank of impact levels (most severe first)
+_IMPACT_ORDER = MappingProxyType({'high': 0, 'medium': 1, 'low': 2, 'none': 3})
+
+
+def _impact_level(rate_change: float) -> str:
+    """Classify a rate change; bisect_left keeps the thresholds exclusive (> not >=)"""
+    return _LEVELS[bisect_left(_THRESH, abs(rate_change))]
+
+
+@lru_cache(maxsize=1024)
+def _parse_event_dt(value: str) -> datetime:
+    """
+    Parse an event timestamp as stored by PostgREST or entered by users
+    ('2019-01-10 08:00', '2019-01-10T08:00:00.123+00:00', '...Z').
+    """
+    return datetime.fromisoformat(value)
+
+
+def _calc_rate(data: List[Dict]) -> float:
+    """Mean daily_change over a window (missing values count as 0); 0 if < 2 samples"""
+    n = len(data)
+    if n < 2:
+        return 0.0
+    total = 0.0
+    for r in data:
+        total += r.get('daily_change') or 0
+    return total / n
+
+
+def _sort_dt(value) -> datetime:
+    """Event timestamp as a naive UTC datetime, comparable with date-only bounds"""
+    dt = _parse_event_dt(str(value))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _timeline_row(event: Dict) -> Tuple:
+    """Compact (date, type, title, intensity, event_id) tuple of an event"""
+    date = event.get('event_date')
+    if date:
+        date = str(date).replace('T', ' ').split('.')[0]
+    return (date, event.get('event_type'), event.get('title'), event.get('intensity'),
+            event.get('event_id'))
+
+
+def _format_event(event: Dict) -> Dict:
+    """Copy of an event with display dates (rows may be shared with the response cache)"""
+    e = dict(event)
+    if e.get('event_date'):
+        e['event_date'] = str(e['event_date']).replace('T', ' ').split('.')[0]
+    if e.get('event_end_date'):
+        e['event_end_date'] = str(e['event_end_date']).replace('T', ' ').split('.')[0]
+    return e
+
+
+def _row_to_timeline(row: Tuple) -> Dict:
+    date, event_type, title, intensity, event_id = row
+    return {
+        'date': date,
+        'type': event_type,
+        'title': title,
+        'intensity': intensity,
+        'event_id': event_id,
+    }
+
+
+def encode_cursor(event_date, event_id) -> str:
+    """Opaque keyset cursor for the last (event_date, event_id) of a page"""
+    raw = f'{event_date}|{event_id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Decode a cursor from encode_cursor; raises ValueError if malformed"""
+    raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    event_date, sep, event_id = raw.rpartition('|')
+    if not sep or not event_date:
+        raise ValueError('Invalid cursor')
+    return event_date, int(event_id)
 
 
 # Demo construction events
@@ -89,56 +301,104 @@ DEMO_EVENTS = [
 ]
 
 
+# Event types: a tuple of read-only mappings, safe to hand out without copying
+EVENT_TYPES: Tuple[Mapping[str, str], ...] = tuple(MappingProxyType(t) for t in (
+    {'value': 'pile', 'label': 'Pile Driving', 'label_cn': 'Pile Driving'},
+    {'value': 'excavation', 'label': 'Excavation', 'label_cn': 'Excavation'},
+    {'value': 'grouting', 'label': 'Grouting', 'label_cn': 'Grouting'},
+    {'value': 'dewatering', 'label': 'Dewatering', 'label_cn': 'Dewatering'},
+    {'value': 'loading', 'label': 'Surface Loading', 'label_cn': 'Surface Loading'},
+    {'value': 'other', 'label': 'Other', 'label_cn': 'Other'},
+))
+
+
 class EventService:
     """Service for construction event management and causal analysis"""
 
-    # Event types
-    EVENT_TYPES = [
-        {'value': 'pile', 'label': 'Pile Driving', 'label_cn': 'Pile Driving'},
-        {'value': 'excavation', 'label': 'Excavation', 'label_cn': 'Excavation'},
-        {'value': 'grouting', 'label': 'Grouting', 'label_cn': 'Grouting'},
-        {'value': 'dewatering', 'label': 'Dewatering', 'label_cn': 'Dewatering'},
-        {'value': 'loading', 'label': 'Surface Loading', 'label_cn': 'Surface Loading'},
-        {'value': 'other', 'label': 'Other', 'label_cn': 'Other'},
-    ]
+    # Event types (shared read-only structure, see module-level EVENT_TYPES)
+    EVENT_TYPES = EVENT_TYPES
 
     # Impact analysis window (hours after event)
     IMPACT_WINDOW_HOURS = 72
 
-    def get_event_types(self) -> List[Dict]:
-        """Get available event types"""
+    # How long the configured point list is reused (seconds)
+    ALL_POINTS_TTL = 300
+
+    def __init__(self):
+        # (fetched_at, point ids) from tunnel_profile_config
+        self._all_points_cache: Optional[Tuple[float, List[str]]] = None
+
+    def _get_all_points(self) -> List[str]:
+        """Configured settlement points, cached for ALL_POINTS_TTL seconds"""
+        cached = self._all_points_cache
+        if cached and time.monotonic() - cached[0] < self.ALL_POINTS_TTL:
+            return cached[1]
+
+        config_data = _safe_request(
+            _url('/rest/v1/tunnel_profile_config?select=point_id'),
+            _headers()
+        )
+        if not config_data:
+            # Use default points for demo (not cached, retry next time)
+            return [f'S{i}' for i in range(0, 26, 2)]
+
+        points = [p['point_id'] for p in config_data]
+        self._all_points_cache = (time.monotonic(), points)
+        return points
+
+    def get_event_types(self) -> Tuple[Mapping[str, str], ...]:
+        """Get available event types (read-only; do not copy per call)"""
         return self.EVENT_TYPES
 
     def list_events(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
-                    event_type: Optional[str] = None) -> List[Dict]:
-        """List construction events with optional filters"""
-        query = '/rest/v1/construction_events?select=*&order=event_date.desc'
+                    event_type: Optional[str] = None, limit: Optional[int] = None,
+                    after: Optional[Tuple[str, int]] = None) -> List[Dict]:
+        """List construction events with optional filters, newest first (see list_events_page)"""
+        return self.list_events_page(start_date, end_date, event_type, limit, after)[0]
+
+    def list_events_page(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                         event_type: Optional[str] = None, limit: Optional[int] = None,
+                         after: Optional[Tuple[str, int]] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        One page of construction events, newest first, and the cursor of the next page
 
-        filters = []
+        limit/after page through the results: `after` is the decoded
+        (event_date, event_id) cursor of the previous page's last event.
+        The cursor is built from the stored event_date (full precision and
+        offset), not the display date, so keyset comparisons stay exact.
+        """
+        params = list(_EVENT_LIST_PARAMS)
         if start_date:
-            filters.append(f'event_date=gte.{start_date}')
+            params.append(('event_date', f'gte.{start_date}'))
         if end_date:
-            filters.append(f'event_date=lte.{end_date}')
+            params.append(('event_date', f'lte.{end_date}'))
         if event_type:
-            filters.append(f'event_type=eq.{event_type}')
-
-        if filters:
-            query += '&' + '&'.join(filters)
+            params.append(('event_type', f'eq.{event_type}'))
+        if after:
+            last_date, last_id = after
+            params.append(
+                ('or', f'(event_date.lt.{last_date},and(event_date.eq.{last_date},event_id.lt.{last_id}))')
+            )
+        if limit:
+            params.append(('limit', limit))
 
-        events = _safe_request(_url(query), _headers())
+        # urlencode escapes spaces and '+' in timestamps; PostgREST operators stay readable
+        query = f"{_EVENTS_PATH}?{urlencode(params, safe='.,()*:')}"
+        events = _safe_request(_url(query), _headers(), revalidate=True)
 
-        # Return demo events if table is empty
+        # Return demo events if table is empty (past the last page: nothing)
         if not events:
-            return DEMO_EVENTS
+            events = [] if after else DEMO_EVENTS[:limit]
+            return events, self._next_cursor(events, limit)
 
-        # Format dates
-        for e in events:
-            if e.get('event_date'):
-                e['event_date'] = str(e['event_date']).replace('T', ' ').split('.')[0]
-            if e.get('event_end_date'):
-                e['event_end_date'] = str(e['event_end_date']).replace('T', ' ').split('.')[0]
+        return [_format_event(e) for e in events], self._next_cursor(events, limit)
 
-        return events
+    @staticmethod
+    def _next_cursor(events: List[Dict], limit: Optional[int]) -> Optional[str]:
+        """Cursor after the last of `events` (raw rows) when the page is full"""
+        if not limit or len(events) != limit:
+            return None
+        return encode_cursor(events[-1].get('event_date'), events[-1].get('event_id'))
 
     def get_event(self, event_id: int) -> Optional[Dict]:
         """Get a single event by ID"""
@@ -156,34 +416,40 @@ class EventService:
 
     def create_event(self, event_data: Dict) -> Dict:
         """Create a new construction event"""
-        r = requests.post(
+        r = _SESSION.post(
             _url('/rest/v1/construction_events'),
             headers=_post_headers(),
-            json=event_data
+            data=_dumps(event_data),
+            timeout=_TIMEOUT
         )
         r.raise_for_status()
-        result = r.json()
+        _invalidate_cache()
+        result = _loads(r.content)
         return result[0] if isinstance(result, list) and result else result
 
     def update_event(self, event_id: int, event_data: Dict) -> Dict:
         """Update an existing event"""
         event_data['updated_at'] = datetime.now().isoformat()
-        r = requests.patch(
+        r = _SESSION.patch(
             _url(f'/rest/v1/construction_events?event_id=eq.{event_id}'),
             headers=_post_headers(),
-            json=event_data
+            data=_dumps(event_data),
+            timeout=_TIMEOUT
         )
         r.raise_for_status()
-        result = r.json()
+        _invalidate_cache()
+        result = _loads(r.content)
         return result[0] if isinstance(result, list) and result else result
 
     def delete_event(self, event_id: int) -> bool:
         """Delete an event"""
-        r = requests.delete(
+        r = _SESSION.delete(
             _url(f'/rest/v1/construction_events?event_id=eq.{event_id}'),
-            headers=_headers()
+            headers=_headers(),
+            timeout=_TIMEOUT
         )
         r.raise_for_status()
+        _invalidate_cache()
         return True
 
     def analyze_event_impact(self, event_id: int, window_hours: int = None) -> Dict:
@@ -225,73 +491,69 @@ class EventService:
             return {'error': 'Event date not set'}
 
         # Parse event date
-        if isinstance(event_date, str):
-            event_dt = datetime.fromisoformat(event_date.replace(' ', 'T').split('.')[0])
-        else:
-            event_dt = event_date
+        event_dt = _parse_event_dt(event_date) if isinstance(event_date, str) else event_date
 
-        # Calculate time windows
-        before_start = (event_dt - timedelta(hours=window)).isoformat()
-        before_end = event_dt.isoformat()
-        after_start = event_dt.isoformat()
-        after_end = (event_dt + timedelta(hours=window)).isoformat()
+        # Calculate time windows (URL-quoted: a '+HH:MM' offset would read as a space)
+        event_iso = quote(event_dt.isoformat())
+        before_start = quote((event_dt - timedelta(hours=window)).isoformat())
+        before_end = event_iso
+        after_start = event_iso
+        after_end = quote((event_dt + timedelta(hours=window)).isoformat())
 
         # Get affected points (if specified) or all points
         affected_points = event.get('affected_points') or []
 
         # If no specific points, use default settlement points
         if not affected_points:
-            config_data = _safe_request(
-                _url('/rest/v1/tunnel_profile_config?select=point_id'),
-                _headers()
-            )
-            if config_data:
-                affected_points = [p['point_id'] for p in config_data]
-            else:
-                # Use default points for demo
-                affected_points = [f'S{i}' for i in range(0, 26, 2)]
+            affected_points = self._get_all_points()
+
+        # Fetch the before/after windows of all points in one query each
+        # (point_id=in.(...)), both issued concurrently, then group by point.
+        # The combined result can exceed max-rows, so it is read in Range pages.
+        in_filter = ','.join(dict.fromkeys(affected_points))
+
+        def fetch_window(start, end):
+            url = _url(f'/rest/v1/processed_settlement_data?select=point_id,measurement_date,value,daily_change&point_id=in.({in_filter})&measurement_date=gte.{start}&measurement_date=lt.{end}&order=point_id,measurement_date')
+            grouped = defaultdict(list)
+            offset = 0
+            while True:
+                h = dict(_headers())
+                h['Range-Unit'] = 'items'
+                h['Range'] = f'{offset}-{offset + FETCH_PAGE_SIZE - 1}'
+                r = _SESSION.get(url, headers=h, timeout=_TIMEOUT)
+                # 206 = partial content, i.e. more pages may follow
+                if r.status_code not in (200, 206):
+                    break
+                page = _loads(r.content)
+                for row in page:
+                    grouped[row.get('point_id')].append(row)
+                offset += len(page)
+                total = r.headers.get('Content-Range', '').rpartition('/')[2]
+                if len(page) < FETCH_PAGE_SIZE or (total.isdigit() and offset >= int(total)):
+                    break
+            return grouped
+
+        before_future = _EXECUTOR.submit(fetch_window, before_start, before_end)
+        after_future = _EXECUTOR.submit(fetch_window, after_start, after_end)
+        before_by_point = before_future.result()
+        after_by_point = after_future.result()
 
         results = []
         has_real_data = False
         for point_id in affected_points:
-            # Get data before event
-            before_r = requests.get(
-                _url(f'/rest/v1/processed_settlement_data?select=*&point_id=eq.{point_id}&measurement_date=gte.{before_start}&measurement_date=lt.{before_end}&order=measurement_date'),
-                headers=_headers()
-            )
-            before_data = before_r.json() if before_r.status_code == 200 else []
-
-            # Get data after event
-            after_r = requests.get(
-                _url(f'/rest/v1/processed_settlement_data?select=*&point_id=eq.{point_id}&measurement_date=gte.{after_start}&measurement_date=lt.{after_end}&order=measurement_date'),
-                headers=_headers()
-            )
-            after_data = after_r.json() if after_r.status_code == 200 else []
+            before_data = before_by_point.get(point_id, [])
+            after_data = after_by_point.get(point_id, [])
 
             if not before_data or not after_data:
                 continue
 
             has_real_data = True
             # Calculate rates
-            def calc_rate(data):
-                if len(data) < 2:
-                    return 0
-                changes = [r.get('daily_change', 0) or 0 for r in data]
-                return sum(changes) / len(changes)
-
-            before_rate = calc_rate(before_data)
-            after_rate = calc_rate(after_data)
+            before_rate = _calc_rate(before_data)
+            after_rate = _calc_rate(after_data)
             rate_change = after_rate - before_rate
 
-            # Determine impact level
-            if abs(rate_change) > 0.1:
-                impact_level = 'high'
-            elif abs(rate_change) > 0.05:
-                impact_level = 'medium'
-            elif abs(rate_change) > 0.02:
-                impact_level = 'low'
-            else:
-                impact_level = 'none'
+            impact_level = _impact_level(rate_change)
 
             results.append({
                 'point_id': point_id,
@@ -305,35 +567,33 @@ class EventService:
 
         # If no real data found, generate demo impact results
         if not has_real_data or not results:
-            import random
-            random.seed(event_id)  # Consistent demo data for same event
+            import numpy as np
+            rng = np.random.default_rng(event_id)  # Consistent demo data for same event
             demo_points = ['S5', 'S6', 'S7', 'S8', 'S10', 'S12', 'S15', 'S18']
-            for pid in demo_points:
-                rate_change = random.uniform(-0.15, 0.05)
-                if abs(rate_change) > 0.1:
-                    impact = 'high'
-                elif abs(rate_change) > 0.05:
-                    impact = 'medium'
-                elif abs(rate_change) > 0.02:
-                    impact = 'low'
-                else:
-                    impact = 'none'
+            n = len(demo_points)
+            rate_changes = rng.uniform(-0.15, 0.05, n)
+            before_rates = rng.uniform(-0.02, 0.01, n).round(4)
+            after_rates = rng.uniform(-0.08, -0.02, n).round(4)
+            # side='left' keeps the thresholds exclusive, same as _impact_level
+            impacts = np.array(_LEVELS)[np.searchsorted(_THRESH, np.abs(rate_changes), side='left')]
+            for pid, before, after, change, impact in zip(
+                demo_points, before_rates.tolist(), after_rates.tolist(),
+                rate_changes.round(4).tolist(), impacts.tolist(),
+            ):
                 results.append({
                     'point_id': pid,
-                    'before_rate': round(random.uniform(-0.02, 0.01), 4),
-                    'after_rate': round(random.uniform(-0.08, -0.02), 4),
-                    'rate_change': round(rate_change, 4),
+                    'before_rate': before,
+                    'after_rate': after,
+                    'rate_change': change,
                     'impact_level': impact,
                 })
 
         # Sort by impact
-        impact_order = {'high': 0, 'medium': 1, 'low': 2, 'none': 3}
-        results.sort(key=lambda x: (impact_order.get(x['impact_level'], 99), -abs(x['rate_change'])))
+        results.sort(key=lambda x, _o=_IMPACT_ORDER: (_o.get(x['impact_level'], 99), -abs(x['rate_change'])))
 
         # Summary
-        high_impact = len([r for r in results if r['impact_level'] == 'high'])
-        medium_impact = len([r for r in results if r['impact_level'] == 'medium'])
-        max_change = max([abs(r['rate_change']) for r in results], default=0)
+        levels = Counter(r['impact_level'] for r in results)
+        max_change = max((abs(r['rate_change']) for r in results), default=0)
 
         return {
             'event': event,
@@ -341,37 +601,86 @@ class EventService:
             'affected_points': results,
             'summary': {
                 'total_analyzed': len(results),
-                'high_impact': high_impact,
-                'medium_impact': medium_impact,
+                'high_impact': levels['high'],
+                'medium_impact': levels['medium'],
                 'max_rate_change': round(max_change, 4),
             }
         }
 
-    def get_events_for_timeline(self, start_date: str, end_date: str) -> List[Dict]:
+    def _get_timeline_index(self):
+        """Sorted (dates, keys, rows, raw_dates) of all stored events, see _timeline_index"""
+        global _timeline_index
+        index = _timeline_index
+        now = time.monotonic()
+        if index and index[0] == _generation and now - index[1] < _TIMELINE_TTL:
+            return index[2:]
+
+        generation = _generation
+        params = urlencode(_EVENT_LIST_PARAMS, safe='.,()*:')
+        events = _safe_request(_url(f'{_EVENTS_PATH}?{params}'), _headers(), revalidate=True)
+        entries = []
+        for e in events:
+            if not e.get('event_date'):
+                continue
+            try:
+                entries.append((_sort_dt(e['event_date']), e.get('event_id'), e))
+            except (TypeError, ValueError):
+                # Unparseable stored date: leave the event off the timeline
+                continue
+        entries.sort(key=lambda x: (x[0], x[1]))
+        dates = [dt for dt, _, _ in entries]
+        keys = [(dt, event_id) for dt, event_id, _ in entries]
+        rows = [_timeline_row(e) for _, _, e in entries]
+        raw_dates = [str(e['event_date']) for _, _, e in entries]
+        _timeline_index = (generation, now, dates, keys, rows, raw_dates)
+        return dates, keys, rows, raw_dates
+
+    def get_events_for_timeline(self, start_date: str, end_date: str, limit: Optional[int] = None,
+                                after: Optional[Tuple[str, int]] = None) -> List[Dict]:
+        """Get events formatted for timeline overlay on charts (see get_events_for_timeline_page)"""
+        return self.get_events_for_timeline_page(start_date, end_date, limit, after)[0]
+
+    def get_events_for_timeline_page(self, start_date: str, end_date: str, limit: Optional[int] = None,
+                                     after: Optional[Tuple[str, int]] = None) -> Tuple[List[Dict], Optional[str]]:
         """
-        Get events formatted for timeline overlay on charts
+        Get events formatted for timeline overlay on charts, and the next page's cursor
 
-        Returns simplified event data for chart annotations
+        Returns simplified event data for chart annotations, newest first.
+        Served from a sorted in-memory index: a date range is two bisects.
         """
-        events = self.list_events(start_date=start_date, end_date=end_date)
-
-        timeline = []
-        for e in events:
-            timeline.append({
-                'date': e.get('event_date'),
-                'type': e.get('event_type'),
-                'title': e.get('title'),
-                'intensity': e.get('intensity'),
-                'event_id': e.get('event_id'),
-            })
-
-        return timeline
+        try:
+            start_dt = _sort_dt(start_date)
+            end_dt = _sort_dt(end_date)
+            after_key = (_sort_dt(after[0]), after[1]) if after else None
+        except (TypeError, ValueError):
+            # Bounds the index cannot compare: let PostgREST filter them
+            events, next_cursor = self.list_events_page(start_date=start_date, end_date=end_date,
+                                                        limit=limit, after=after)
+            return [_row_to_timeline(_timeline_row(e)) for e in events], next_cursor
+
+        dates, keys, rows, raw_dates = self._get_timeline_index()
+        lo = bisect_left(dates, start_dt)
+        hi = bisect_right(dates, end_dt)
+        if after_key:
+            hi = min(hi, bisect_left(keys, after_key))
+        if hi <= lo:
+            # Same fallback as list_events: demo events when nothing is stored
+            events = [] if after else DEMO_EVENTS[:limit]
+            return [_row_to_timeline(_timeline_row(e)) for e in events], self._next_cursor(events, limit)
+
+        stop = max(lo, hi - limit) if limit else lo
+        next_cursor = None
+        if limit and hi - stop == limit:
+            # The page ends at index `stop` (oldest event on it)
+            next_cursor = encode_cursor(raw_dates[stop], keys[stop][1])
+        return list(map(_row_to_timeline, reversed(rows[stop:hi]))), next_cursor
 
     def get_summary(self) -> Dict:
         """Get summary of construction events"""
         events = _safe_request(
             _url('/rest/v1/construction_events?select=event_id,event_type'),
-            _headers()
+            _headers(),
+            revalidate=True
         )
 
         # Use demo events if empty
@@ -3,40 +3,160 @@
 Joint Analysis Service - Settlement + Crack combined analysis
 """
 
+import json
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
 from typing import List, Dict, Optional
 
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .cache import ttl_cache
+
+
+# Supabase base URL and read headers, resolved once on first use (not at
+# import, so the app has loaded its environment by then) and reused after
+_supabase = None
+
+
+def _supabase_config():
+    global _supabase
+    if _supabase is None:
+        anon = os.environ.get('SUPABASE_ANON_KEY', '')
+        h = {
+            'apikey': anon,
+            'Accept': 'application/json',
+        }
+        if anon:
+            h['Authorization'] = f'Bearer {anon}'
+        _supabase = (os.environ.get('SUPABASE_URL', '').rstrip('/'), h)
+    return _supabase
+
 
 def _headers():
-    anon = os.environ.get('SUPABASE_ANON_KEY', '')
-    h = {
-        'apikey': anon,
-        'Accept': 'application/json',
-    }
-    if anon:
-        h['Authorization'] = f'Bearer {anon}'
-    return h
+    """Shared read headers; copy before adding per-request entries"""
+    return _supabase_config()[1]
 
 
 def _url(path):
-    base = os.environ.get('SUPABASE_URL', '').rstrip('/')
-    return f'{base}{path}'
+    return _supabase_config()[0] + path
+
+
+def _loads(content):
+    """Decode a Supabase response body (orjson when available)"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
 
+def _dumps(obj):
+    """Serialize a request body to JSON bytes (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
 
-def _safe_request(url, headers):
-    """Make a request and return empty list on error"""
+
+# Shared session: keep-alive connections to Supabase are reused across calls.
+# Auth headers (see _headers) are passed with each request.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=10, pool_maxsize=20, max_retries=Retry(total=2, backoff_factor=0.2)
+))
+
+# (connect, read) timeout for Supabase GETs
+_TIMEOUT = (3, 10)
+
+# Concurrent Supabase queries. One bounded executor is shared by all
+# requests instead of spawning threads per call.
+_MAX_WORKERS = 16
+_EXECUTOR = ThreadPoolExecutor(max_workers=_MAX_WORKERS, thread_name_prefix='joint-io')
+
+
+def _safe_request(url, params=None):
+    """
+    Make a request and return empty list on error
+
+    Filters on caller-supplied values go in `params` so that requests
+    percent-encodes them.
+    """
     try:
-        r = requests.get(url, headers=headers)
+        r = _SESSION.get(url, params=params, headers=_headers(), timeout=_TIMEOUT)
         if r.status_code == 404 or r.status_code >= 500:
             return []
         r.raise_for_status()
-        return r.json()
+        return _loads(r.content)
     except Exception:
         return []
 
 
+def _rpc(name, params):
+    """
+    Call a PostgREST function with JSON params.
+    Returns its rows, or None if the function is missing or the call fails.
+    """
+    try:
+        r = _SESSION.post(
+            _url(f'/rest/v1/rpc/{name}'),
+            data=_dumps(params),
+            headers={**_headers(), 'Content-Type': 'application/json'},
+            timeout=_TIMEOUT
+        )
+        if r.status_code != 200:
+            return None
+        return _loads(r.content)
+    except Exception:
+        return None
+
+
+def _fetch_latest_crack(crack_point):
+    """Latest 10 readings of a crack point, newest first"""
+    return _safe_request(_url('/rest/v1/crack_monitoring_data'), {
+        'select': '*', 'point_id': f'eq.{crack_point}', 'order': 'measurement_date.desc', 'limit': 10,
+    })
+
+
+def _fetch_latest_cracks(crack_points):
+    """
+    Latest 10 readings of each crack point, newest first: {point_id: rows}.
+    One call to get_latest_crack_readings (08_advanced_analysis_rpc.sql);
+    falls back to one request per point if the function is not deployed.
+    """
+    if not crack_points:
+        return {}
+    rows = _safe_request(_url('/rest/v1/rpc/get_latest_crack_readings'), {
+        'points': '{' + ','.join(crack_points) + '}', 'n': 10,
+    })
+    if not rows:
+        return dict(zip(crack_points, _EXECUTOR.map(_fetch_latest_crack, crack_points)))
+    latest = {cp: [] for cp in crack_points}
+    for point_id, group in groupby(rows, key=itemgetter('point_id')):
+        latest[point_id] = list(group)
+    return latest
+
+
+def _column(rows, key):
+    """Non-null values of `key` across rows as a float64 array"""
+    return np.fromiter(
+        (v for v in (r.get(key) for r in rows) if v is not None), dtype=np.float64
+    )
+
+
+# Time series columns; measurement_date::date makes PostgREST return plain
+# YYYY-MM-DD dates, so rows need no reformatting here
+_SETTLEMENT_SERIES_COLUMNS = 'point_id,measurement_date::date,value,cumulative_change,daily_change'
+_CRACK_SERIES_COLUMNS = 'point_id,crack_id,measurement_date::date,value,cumulative_change,daily_change'
+
+
 # Default settlement-crack mapping (demo data)
 DEFAULT_MAPPING = [
     {'settlement_point': 'S3', 'crack_point': 'F1-1', 'distance_m': 5.2, 'correlation_strength': 'strong'},
@@ -54,6 +174,10 @@ DEFAULT_MAPPING = [
 ]
 
 
+# How long the settlement-crack mapping is reused (seconds)
+MAPPING_TTL = 300
+
+
 class JointAnalysisService:
     """Service for settlement + crack joint analysis"""
 
@@ -61,11 +185,11 @@ class JointAnalysisService:
     SETTLEMENT_RATE_THRESHOLD = 0.05  # mm/day
     CRACK_RATE_THRESHOLD = 0.02  # mm/day
 
+    @ttl_cache(seconds=MAPPING_TTL)
     def get_mapping(self) -> List[Dict]:
         """Get settlement-crack point mapping"""
         data = _safe_request(
-            _url('/rest/v1/settlement_crack_mapping?select=*&order=settlement_point'),
-            _headers()
+            _url('/rest/v1/settlement_crack_mapping?select=*&order=settlement_point')
         )
         # Return demo data if table is empty
         if not data:
@@ -74,10 +198,9 @@ class JointAnalysisService:
 
     def get_related_cracks(self, settlement_point: str) -> List[Dict]:
         """Get crack points related to a settlement point"""
-        data = _safe_request(
-            _url(f'/rest/v1/settlement_crack_mapping?select=*&settlement_point=eq.{settlement_point}'),
-            _headers()
-        )
+        data = _safe_request(_url('/rest/v1/settlement_crack_mapping'), {
+            'select': '*', 'settlement_point': f'eq.{settlement_point}',
+        })
         # Fall back to demo data
         if not data:
             return [m for m in DEFAULT_MAPPING if m['settlement_point'] == settlement_point]
@@ -85,10 +208,9 @@ class JointAnalysisService:
 
     def get_related_settlement(self, crack_point: str) -> List[Dict]:
         """Get settlement points related to a crack point"""
-        return _safe_request(
-            _url(f'/rest/v1/settlement_crack_mapping?select=*&crack_point=eq.{crack_point}'),
-            _headers()
-        )
+        return _safe_request(_url('/rest/v1/settlement_crack_mapping'), {
+            'select': '*', 'crack_point': f'eq.{crack_point}',
+        })
 
     def get_joint_time_series(self, settlement_point: str) -> Dict:
         """
@@ -107,35 +229,28 @@ class JointAnalysisService:
                 ]
             }
         """
-        # Get settlement data
-        settlement_data = _safe_request(
-            _url(f'/rest/v1/processed_settlement_data?select=*&point_id=eq.{settlement_point}&order=measurement_date'),
-            _headers()
+        # Get settlement data while the related crack mappings are looked up
+        settlement_future = _EXECUTOR.submit(
+            _safe_request,
+            _url('/rest/v1/processed_settlement_data'),
+            {'select': _SETTLEMENT_SERIES_COLUMNS, 'point_id': f'eq.{settlement_point}', 'order': 'measurement_date'}
         )
-
-        # Format dates
-        for row in settlement_data:
-            if row.get('measurement_date'):
-                row['measurement_date'] = str(row['measurement_date']).split('T')[0]
-
-        # Get related crack mappings
         mappings = self.get_related_cracks(settlement_point)
 
-        related_cracks = []
-        for m in mappings:
-            crack_point = m['crack_point']
-
-            # Get crack data
-            crack_data = _safe_request(
-                _url(f'/rest/v1/crack_monitoring_data?select=*&point_id=eq.{crack_point}&order=measurement_date'),
-                _headers()
-            )
+        # Get crack data of all related cracks concurrently
+        crack_points = [m['crack_point'] for m in mappings]
+        crack_results = list(_EXECUTOR.map(
+            lambda cp: _safe_request(
+                _url('/rest/v1/crack_monitoring_data'),
+                {'select': _CRACK_SERIES_COLUMNS, 'point_id': f'eq.{cp}', 'order': 'measurement_date'}
+            ),
+            crack_points
+        ))
 
-            # Format dates
-            for row in crack_data:
-                if row.get('measurement_date'):
-                    row['measurement_date'] = str(row['measurement_date']).split('T')[0]
+        settlement_data = settlement_future.result()
 
+        related_cracks = []
+        for m, crack_point, crack_data in zip(mappings, crack_points, crack_results):
             related_cracks.append({
                 'crack_point': crack_point,
                 'crack_id': m.get('crack_id') or crack_point.split('-')[0],
@@ -156,6 +271,60 @@ class JointAnalysisService:
 
         Returns correlation metrics and trend comparison
         """
+        # Per-point aggregates from the stats views (08_advanced_analysis_rpc.sql):
+        # one row per point instead of the full histories
+        stats_future = _EXECUTOR.submit(
+            _safe_request,
+            _url('/rest/v1/settlement_point_stats'),
+            {'select': 'total_change,avg_daily_rate,max_daily_rate', 'point_id': f'eq.{settlement_point}'}
+        )
+        mappings = self.get_related_cracks(settlement_point)
+        settlement_stats = stats_future.result()
+        if not settlement_stats:
+            # Views not deployed (or no data): compute from the time series
+            return self._analyze_correlation_series(settlement_point)
+
+        crack_stats = {}
+        if mappings:
+            crack_points = ','.join(m['crack_point'] for m in mappings)
+            crack_stats = {
+                r['point_id']: r for r in _safe_request(
+                    _url('/rest/v1/crack_point_stats'),
+                    {'select': 'point_id,total_change,n_values', 'point_id': f'in.({crack_points})'}
+                )
+            }
+
+        crack_analysis = []
+        for m in mappings:
+            stats = crack_stats.get(m['crack_point'])
+            if not stats:
+                continue
+            if stats['n_values'] >= 2:
+                total_change = stats['total_change']
+                avg_rate = total_change / stats['n_values']
+            else:
+                total_change = 0
+                avg_rate = 0
+            crack_analysis.append({
+                'crack_point': m['crack_point'],
+                'correlation_strength': m.get('correlation_strength'),
+                'total_change': total_change,
+                'avg_rate': avg_rate,
+            })
+
+        s = settlement_stats[0]
+        return {
+            'settlement_point': settlement_point,
+            'settlement_stats': {
+                'total_change': s['total_change'] if s['total_change'] is not None else 0,
+                'avg_daily_rate': s['avg_daily_rate'] if s['avg_daily_rate'] is not None else 0,
+                'max_daily_rate': s['max_daily_rate'] if s['max_daily_rate'] is not None else 0,  # min because negative = settling
+            },
+            'crack_analysis': crack_analysis,
+        }
+
+    def _analyze_correlation_series(self, settlement_point: str) -> Dict:
+        """analyze_correlation computed from the full settlement and crack series"""
         joint_data = self.get_joint_time_series(settlement_point)
 
         settlement_data = joint_data['settlement_data']
@@ -163,13 +332,13 @@ class JointAnalysisService:
             return {'error': 'No settlement data found'}
 
         # Calculate settlement statistics
-        settlement_values = [r.get('cumulative_change', 0) for r in settlement_data if r.get('cumulative_change') is not None]
-        settlement_changes = [r.get('daily_change', 0) for r in settlement_data if r.get('daily_change') is not None]
+        settlement_values = _column(settlement_data, 'cumulative_change')
+        settlement_changes = _column(settlement_data, 'daily_change')
 
         settlement_stats = {
-            'total_change': settlement_values[-1] if settlement_values else 0,
-            'avg_daily_rate': sum(settlement_changes) / len(settlement_changes) if settlement_changes else 0,
-            'max_daily_rate': min(settlement_changes) if settlement_changes else 0,  # min because negative = settling
+            'total_change': float(settlement_values[-1]) if settlement_values.size else 0,
+            'avg_daily_rate': float(settlement_changes.mean()) if settlement_changes.size else 0,
+            'max_daily_rate': float(settlement_changes.min()) if settlement_changes.size else 0,  # min because negative = settling
         }
 
         # Analyze each related crack
@@ -179,11 +348,11 @@ class JointAnalysisService:
             if not crack_data:
                 continue
 
-            crack_values = [r.get('value', 0) for r in crack_data if r.get('value') is not None]
+            crack_values = _column(crack_data, 'value')
 
-            if len(crack_values) >= 2:
-                total_change = crack_values[-1] - crack_values[0]
-                avg_rate = total_change / len(crack_values) if crack_values else 0
+            if crack_values.size >= 2:
+                total_change = float(crack_values[-1] - crack_values[0])
+                avg_rate = total_change / crack_values.size
             else:
                 total_change = 0
                 avg_rate = 0
@@ -201,52 +370,109 @@ class JointAnalysisService:
             'crack_analysis': crack_analysis,
         }
 
+    def analyze_correlation_bulk(self, points: List[str]) -> Dict[str, Dict]:
+        """
+        analyze_correlation for many settlement points at once, keyed by point
+
+        Points are analyzed concurrently. The outer pool is separate from
+        _EXECUTOR because each analysis itself waits on _EXECUTOR tasks.
+        """
+        points = list(dict.fromkeys(points))
+        if not points:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(8, len(points))) as ex:
+            return dict(zip(points, ex.map(self.analyze_correlation, points)))
+
     def get_joint_alerts(self) -> List[Dict]:
         """
         Get joint alerts where both settlement and crack are abnormal
 
         Returns list of alerts with combined severity
         """
-        alerts = []
-
         # Get all mappings
         mappings = self.get_mapping()
         if not mappings:
             return []
 
-        # Group by settlement point
-        from collections import defaultdict
-        point_cracks = defaultdict(list)
-        for m in mappings:
-            point_cracks[m['settlement_point']].append(m)
+        alerts = [self._make_alert(**r) for r in self._alert_rows(mappings)]
 
-        # Get settlement analysis
-        settlement_analysis_data = _safe_request(
-            _url('/rest/v1/settlement_analysis?select=*'),
-            _headers()
-        )
-        settlement_analysis = {r['point_id']: r for r in settlement_analysis_data}
+        # Sort by severity
+        severity_order = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+        alerts.sort(key=lambda x: severity_order.get(x['severity'], 99))
+
+        return alerts
+
+    def _alert_rows(self, mappings: List[Dict]) -> List[Dict]:
+        """Abnormal settlement point / crack pairs (without severity or wording)"""
+        rows = None
+        if mappings is not DEFAULT_MAPPING:
+            # Join + thresholds in one round trip (08_advanced_analysis_rpc.sql)
+            rows = _rpc('get_joint_alerts', {
+                's_thresh': self.SETTLEMENT_RATE_THRESHOLD,
+                'c_thresh': self.CRACK_RATE_THRESHOLD,
+            })
+        if rows is None:
+            # Demo mapping or function not deployed: evaluate here
+            rows = self._joint_alert_rows(mappings)
+        return rows
+
+    @staticmethod
+    def _make_alert(settlement_point, crack_point, settlement_alert_level, settlement_trend,
+                    settlement_rate, crack_rate) -> Dict:
+        """Joint alert record for an abnormal settlement point / crack pair"""
+        severity = 'critical' if settlement_alert_level == 'alert' else 'high'
+        return {
+            'settlement_point': settlement_point,
+            'crack_point': crack_point,
+            'severity': severity,
+            'settlement_alert_level': settlement_alert_level,
+            'settlement_trend': settlement_trend,
+            'settlement_rate': settlement_rate,
+            'crack_rate': crack_rate,
+            'message': f'{settlement_point} settlement abnormal ({settlement_trend}) with related crack {crack_point} expanding',
+            'recommendation': 'Urgent: Schedule joint inspection for settlement point and crack monitoring'
+        }
+
+    def _joint_alert_rows(self, mappings: List[Dict]) -> List[Dict]:
+        """Abnormal settlement point / crack pairs, evaluated in Python"""
+        rows = []
+
+        settlement_analysis_data = _safe_request(_url('/rest/v1/settlement_analysis?select=*'))
+
+        # Abnormal settlement points (alert level or rate): point -> (analysis, alert level, |rate|).
+        # Points without an analysis row count as normal.
+        hot_points = {}
+        for r in settlement_analysis_data:
+            s_rate = abs(r.get('avg_daily_rate', 0) or 0)
+            s_alert_level = r.get('alert_level') or 'normal'
+            if s_rate >= self.SETTLEMENT_RATE_THRESHOLD or s_alert_level != 'normal':
+                hot_points[r['point_id']] = (r, s_alert_level, s_rate)
+        if not hot_points:
+            return rows
+
+        # Mappings come ordered by settlement_point, so one groupby pass groups them
+        abnormal_points = [
+            (settlement_point, list(group), *hot_points[settlement_point])
+            for settlement_point, group in groupby(
+                (m for m in mappings if m['settlement_point'] in hot_points),
+                key=itemgetter('settlement_point')
+            )
+        ]
+
+        # Get latest crack data of all related cracks in one call
+        all_crack_points = list(dict.fromkeys(
+            cm['crack_point'] for _, crack_mappings, _, _, _ in abnormal_points for cm in crack_mappings
+        ))
+        crack_data_map = _fetch_latest_cracks(all_crack_points)
 
         # Check each settlement point
-        for settlement_point, crack_mappings in point_cracks.items():
-            s_ana = settlement_analysis.get(settlement_point, {})
-            s_alert_level = s_ana.get('alert_level', 'normal')
+        for settlement_point, crack_mappings, s_ana, s_alert_level, s_rate in abnormal_points:
             s_trend = s_ana.get('trend_type', '')
-            s_rate = abs(s_ana.get('avg_daily_rate', 0) or 0)
-
-            # Skip if settlement is normal
-            if s_alert_level == 'normal' and s_rate < self.SETTLEMENT_RATE_THRESHOLD:
-                continue
 
             # Check related cracks
             for cm in crack_mappings:
                 crack_point = cm['crack_point']
-
-                # Get latest crack data
-                crack_data = _safe_request(
-                    _url(f'/rest/v1/crack_monitoring_data?select=*&point_id=eq.{crack_point}&order=measurement_date.desc&limit=10'),
-                    _headers()
-                )
+                crack_data = crack_data_map[crack_point]
 
                 if len(crack_data) < 2:
                     continue
@@ -257,42 +483,28 @@ class JointAnalysisService:
 
                 # Check if crack is also abnormal
                 if crack_rate > self.CRACK_RATE_THRESHOLD:
-                    # Generate joint alert
-                    severity = 'critical' if s_alert_level == 'alert' else 'high'
-
-                    alerts.append({
+                    rows.append({
                         'settlement_point': settlement_point,
                         'crack_point': crack_point,
-                        'severity': severity,
                         'settlement_alert_level': s_alert_level,
                         'settlement_trend': s_trend,
                         'settlement_rate': s_rate,
                         'crack_rate': crack_rate,
-                        'message': f'{settlement_point} settlement abnormal ({s_trend}) with related crack {crack_point} expanding',
-                        'recommendation': 'Urgent: Schedule joint inspection for settlement point and crack monitoring'
                     })
 
-        # Sort by severity
-        severity_order = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
-        alerts.sort(key=lambda x: severity_order.get(x['severity'], 99))
-
-        return alerts
+        return rows
 
     def get_summary(self) -> Dict:
         """Get summary of joint analysis data"""
         mappings = self.get_mapping()
 
-        # Count unique points
-        settlement_points = set(m['settlement_point'] for m in mappings)
-        crack_points = set(m['crack_point'] for m in mappings)
-
-        # Get alerts count
-        alerts = self.get_joint_alerts()
+        # Alert counts only: no messages or sorting needed
+        alert_rows = self._alert_rows(mappings) if mappings else []
 
         return {
             'total_mappings': len(mappings),
-            'settlement_points_with_cracks': len(settlement_points),
-            'crack_points_monitored': len(crack_points),
-            'active_joint_alerts': len(alerts),
-            'critical_alerts': len([a for a in alerts if a['severity'] == 'critical']),
+            'settlement_points_with_cracks': len({m['settlement_point'] for m in mappings}),
+            'crack_points_monitored': len({m['crack_point'] for m in mappings}),
+            'active_joint_alerts': len(alert_rows),
+            'critical_alerts': sum(1 for r in alert_rows if r['settlement_alert_level'] == 'alert'),
         }
@@ -3,37 +3,89 @@
 Profile Service - Tunnel profile data retrieval and processing
 """
 
+import json
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .cache import ttl_cache
+
+
+# Supabase base URL and read headers, resolved once on first use (not at
+# import, so the app has loaded its environment by then) and reused after
+_supabase = None
+
+
+def _supabase_config():
+    global _supabase
+    if _supabase is None:
+        anon = os.environ.get('SUPABASE_ANON_KEY', '')
+        h = {
+            'apikey': anon,
+            'Accept': 'application/json',
+        }
+        if anon:
+            h['Authorization'] = f'Bearer {anon}'
+        _supabase = (os.environ.get('SUPABASE_URL', '').rstrip('/'), h)
+    return _supabase
+
 
 def _headers():
-    anon = os.environ.get('SUPABASE_ANON_KEY', '')
-    h = {
-        'apikey': anon,
-        'Accept': 'application/json',
-    }
-    if anon:
-        h['Authorization'] = f'Bearer {anon}'
-    return h
+    """Shared read headers; copy before adding per-request entries"""
+    return _supabase_config()[1]
 
 
 def _url(path):
-    base = os.environ.get('SUPABASE_URL', '').rstrip('/')
-    return f'{base}{path}'
+    return _supabase_config()[0] + path
+
 
+def _loads(content):
+    """Decode a Supabase response body (orjson when available)"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
 
-def _safe_request(url, headers):
-    """Make a request and return empty list on error"""
+
+# Shared session: keep-alive connections to Supabase are reused across calls.
+# Auth headers (see _headers) are passed with each request.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=10, pool_maxsize=20, max_retries=Retry(total=2, backoff_factor=0.2)
+))
+
+# (connect, read) timeout for Supabase GETs
+_TIMEOUT = (3, 10)
+
+# Concurrent Supabase queries. One bounded executor is shared by all
+# requests instead of spawning threads per call.
+_MAX_WORKERS = 16
+_EXECUTOR = ThreadPoolExecutor(max_workers=_MAX_WORKERS, thread_name_prefix='profile-io')
+
+
+def _safe_request(url, params=None):
+    """
+    Make a request and return empty list on error
+
+    Filters on caller-supplied values go in `params` so that requests
+    percent-encodes them.
+    """
     try:
-        r = requests.get(url, headers=headers)
+        r = _SESSION.get(url, params=params, headers=_headers(), timeout=_TIMEOUT)
         if r.status_code == 404 or r.status_code >= 500:
             # Table might not exist
             return []
         r.raise_for_status()
-        return r.json()
+        return _loads(r.content)
     except Exception:
         return []
 
@@ -46,25 +98,29 @@ DEFAULT_PROFILE_CONFIG = [
 ]
 
 
+# How long chainage config and geological layers are reused (seconds)
+CONFIG_TTL = 300
+
+
 class ProfileService:
     """Service for tunnel profile data operations"""
 
+    @ttl_cache(seconds=CONFIG_TTL)
     def get_profile_config(self) -> List[Dict]:
         """Get all tunnel profile configuration (point -> chainage mapping)"""
         data = _safe_request(
-            _url('/rest/v1/tunnel_profile_config?select=*&order=chainage_m'),
-            _headers()
+            _url('/rest/v1/tunnel_profile_config?select=*&order=chainage_m')
         )
         # Fall back to default config if table is empty or missing
         if not data:
             return DEFAULT_PROFILE_CONFIG
         return data
 
+    @ttl_cache(seconds=CONFIG_TTL)
     def get_geological_layers(self) -> List[Dict]:
         """Get geological layer data for profile background"""
         data = _safe_request(
-            _url('/rest/v1/geological_layers?select=*&order=depth_top'),
-            _headers()
+            _url('/rest/v1/geological_layers?select=*&order=depth_top')
         )
         # Return default layers if table is empty
         if not data:
@@ -102,22 +158,48 @@ class ProfileService:
         try:
             if date:
                 # Specific date
-                query = f'/rest/v1/processed_settlement_data?select=*&measurement_date=gte.{date}T00:00:00&measurement_date=lt.{date}T23:59:59&order=point_id'
+                data = self._fetch_settlement_for_date(date)
             else:
-                # Get latest date first
-                latest = _safe_request(
-                    _url('/rest/v1/processed_settlement_data?select=measurement_date&order=measurement_date.desc&limit=1'),
-                    _headers()
-                )
-                if not latest:
-                    return {"date": None, "profile": [], "layers": self.get_geological_layers()}
-                date = str(latest[0]['measurement_date']).split('T')[0]
-                query = f'/rest/v1/processed_settlement_data?select=*&measurement_date=gte.{date}T00:00:00&measurement_date=lt.{date}T23:59:59&order=point_id'
-
-            data = _safe_request(_url(query), _headers())
+                # Latest day's rows in one call (RPC from 08_advanced_analysis_rpc.sql)
+                data = _safe_request(_url('/rest/v1/rpc/get_latest_day_profile'))
+                if data:
+                    date = str(data[0]['measurement_date']).split('T')[0]
+                else:
+                    # RPC not deployed: get latest date first
+                    latest = _safe_request(
+                        _url('/rest/v1/processed_settlement_data?select=measurement_date&order=measurement_date.desc&limit=1')
+                    )
+                    if not latest:
+                        return {"date": None, "profile": [], "layers": self.get_geological_layers()}
+                    date = str(latest[0]['measurement_date']).split('T')[0]
+                    data = self._fetch_settlement_for_date(date)
         except Exception:
             return {"date": None, "profile": [], "layers": self.get_geological_layers()}
 
+        profile = self._build_profile(data, chainage_map)
+
+        # Get layers
+        layers = self.get_geological_layers()
+
+        return {
+            "date": date,
+            "profile": profile,
+            "layers": layers
+        }
+
+    @staticmethod
+    def _fetch_settlement_for_date(date: str) -> List[Dict]:
+        """Settlement readings of all points on one day (YYYY-MM-DD)"""
+        return _safe_request(_url('/rest/v1/processed_settlement_data'), [
+            ('select', '*'),
+            ('measurement_date', f'gte.{date}T00:00:00'),
+            ('measurement_date', f'lt.{date}T23:59:59'),
+            ('order', 'point_id'),
+        ])
+
+    @staticmethod
+    def _build_profile(data: List[Dict], chainage_map: Dict) -> List[Dict]:
+        """Profile points (first reading of each point) sorted by chainage"""
         # Group by point_id and take latest reading of the day
         point_data = {}
         for row in data:
@@ -141,20 +223,18 @@ class ProfileService:
         # Sort by chainage
         profile.sort(key=lambda x: x['chainage_m'])
 
-        # Get layers
-        layers = self.get_geological_layers()
-
-        return {
-            "date": date,
-            "profile": profile,
-            "layers": layers
-        }
+        return profile
 
     def get_available_dates(self) -> List[str]:
         """Get list of available dates for profile visualization"""
+        # Distinct days computed by the database (view from 08_advanced_analysis_rpc.sql)
+        days = _safe_request(_url('/rest/v1/settlement_dates?select=d&order=d'))
+        if days:
+            return [row['d'] for row in days]
+
+        # View not deployed: dedupe all measurement dates here
         data = _safe_request(
-            _url('/rest/v1/processed_settlement_data?select=measurement_date&order=measurement_date'),
-            _headers()
+            _url('/rest/v1/processed_settlement_data?select=measurement_date&order=measurement_date')
         )
 
         # Extract unique dates
@@ -178,17 +258,31 @@ class ProfileService:
         Returns:
             List of profile data for each frame date
         """
-        frames = []
         current = datetime.strptime(start_date, '%Y-%m-%d')
         end = datetime.strptime(end_date, '%Y-%m-%d')
-
+        dates = []
         while current <= end:
-            date_str = current.strftime('%Y-%m-%d')
-            frame = self.get_profile_data(date_str)
-            if frame['profile']:  # Only include if data exists
-                frames.append(frame)
+            dates.append(current.strftime('%Y-%m-%d'))
             current += timedelta(days=interval_days)
 
+        # Config and layers are shared by all frames; only the settlement
+        # data is fetched per frame. All of it is fetched concurrently.
+        config_future = _EXECUTOR.submit(self.get_profile_config)
+        layers_future = _EXECUTOR.submit(self.get_geological_layers)
+        day_data = list(_EXECUTOR.map(self._fetch_settlement_for_date, dates))
+        chainage_map = {p['point_id']: p['chainage_m'] for p in config_future.result()}
+        layers = layers_future.result()
+
+        frames = []
+        for date_str, data in zip(dates, day_data):
+            profile = self._build_profile(data, chainage_map)
+            if profile:  # Only include if data exists
+                frames.append({
+                    "date": date_str,
+                    "profile": profile,
+                    "layers": layers
+                })
+
         return frames
 
     def get_profile_statistics(self) -> Dict:
@@ -197,8 +291,7 @@ class ProfileService:
 
         # Get latest settlement analysis
         analysis_data = _safe_request(
-            _url('/rest/v1/settlement_analysis?select=point_id,avg_value,total_change,trend_type,alert_level'),
-            _headers()
+            _url('/rest/v1/settlement_analysis?select=point_id,avg_value,total_change,trend_type,alert_level')
         )
         analysis = {row['point_id']: row for row in analysis_data}
 
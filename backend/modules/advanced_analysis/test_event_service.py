@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, '..', '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from modules.advanced_analysis import event_service
+from modules.advanced_analysis.event_service import EventService, decode_cursor, encode_cursor
+
+
+# Stored rows as PostgREST returns them (newest first). Events 5/4 and 3/2
+# fall in the same second and differ only in the fractional part.
+STORED_EVENTS = [
+    {'event_id': 6, 'event_date': '2024-03-02T09:00:00+00:00', 'event_type': 'pile', 'title': 'E6', 'intensity': 'high'},
+    {'event_id': 5, 'event_date': '2024-03-01T08:00:00.750000+00:00', 'event_type': 'pile', 'title': 'E5', 'intensity': 'low'},
+    {'event_id': 4, 'event_date': '2024-03-01T08:00:00.250000+00:00', 'event_type': 'grouting', 'title': 'E4', 'intensity': 'low'},
+    {'event_id': 3, 'event_date': '2024-03-01T08:00:00.250000+00:00', 'event_type': 'grouting', 'title': 'E3', 'intensity': 'medium'},
+    {'event_id': 2, 'event_date': '2024-03-01T08:00:00.125000+00:00', 'event_type': 'excavation', 'title': 'E2', 'intensity': 'medium'},
+    {'event_id': 1, 'event_date': '2024-02-28T16:30:00+00:00', 'event_type': 'dewatering', 'title': 'E1', 'intensity': 'high'},
+]
+
+
+class EventCursorTest(unittest.TestCase):
+    def setUp(self):
+        event_service._timeline_index = None
+        patcher = mock.patch.object(event_service, '_safe_request', return_value=STORED_EVENTS)
+        self.safe_request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, event_service, '_timeline_index', None)
+        self.service = EventService()
+
+    def test_cursor_round_trip_keeps_fractional_seconds(self):
+        raw = '2024-03-01T08:00:00.250000+00:00'
+        self.assertEqual(decode_cursor(encode_cursor(raw, 4)), (raw, 4))
+
+    def test_decode_cursor_rejects_garbage(self):
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor('', 1))
+
+    def test_timeline_pages_cover_every_event_once(self):
+        seen = []
+        after = None
+        for _ in range(len(STORED_EVENTS)):
+            page, cursor = self.service.get_events_for_timeline_page('2024-01-01', '2024-12-31', limit=2, after=after)
+            seen.extend(item['event_id'] for item in page)
+            if cursor is None:
+                break
+            after = decode_cursor(cursor)
+        self.assertEqual(seen, [6, 5, 4, 3, 2, 1])
+
+    def test_timeline_cursor_uses_stored_date(self):
+        page, cursor = self.service.get_events_for_timeline_page('2024-01-01', '2024-12-31', limit=3)
+        self.assertEqual([item['event_id'] for item in page], [6, 5, 4])
+        # Display dates drop the fraction; the cursor must not
+        self.assertEqual(page[1]['date'], '2024-03-01 08:00:00')
+        self.assertEqual(decode_cursor(cursor), ('2024-03-01T08:00:00.250000+00:00', 4))
+
+    def test_list_events_cursor_uses_stored_date(self):
+        self.safe_request.return_value = STORED_EVENTS[:3]
+        events, cursor = self.service.list_events_page(limit=3)
+        self.assertEqual(events[2]['event_date'], '2024-03-01 08:00:00')
+        self.assertEqual(decode_cursor(cursor), ('2024-03-01T08:00:00.250000+00:00', 4))
+
+        # The decoded cursor goes into the keyset filter unchanged
+        self.service.list_events_page(limit=3, after=decode_cursor(cursor))
+        url = self.safe_request.call_args[0][0]
+        self.assertIn('event_date.eq.2024-03-01T08:00:00.250000%2B00:00', url)
+        self.assertIn('event_id.lt.4', url)
+
+    def test_short_page_has_no_cursor(self):
+        self.safe_request.return_value = STORED_EVENTS[:2]
+        _, cursor = self.service.list_events_page(limit=3)
+        self.assertIsNone(cursor)
+
+
+if __name__ == '__main__':
+    unittest.main()
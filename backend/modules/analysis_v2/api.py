@@ -6,10 +6,37 @@
 
 from flask import Blueprint, jsonify, request
 from datetime import datetime
+from itertools import islice
+import threading
+import time
 import traceback
 import math
 import os
 
+# 依赖在模块加载时导入一次；某个服务导入失败只影响对应接口，不影响整个蓝图注册
+try:
+    from .settlement_service import SettlementAnalysisService
+except Exception as e:
+    print(f"[Analysis V2] Settlement service unavailable: {e}")
+    SettlementAnalysisService = None
+try:
+    from .temperature_service import TemperatureAnalysisService
+except Exception as e:
+    print(f"[Analysis V2] Temperature service unavailable: {e}")
+    TemperatureAnalysisService = None
+try:
+    from modules.ticket_system.models.ticket import TicketModel
+    from modules.ticket_system.services import ticket_notifier
+except Exception as e:
+    print(f"[Analysis V2] Ticket system unavailable: {e}")
+    TicketModel = None
+    ticket_notifier = None
+try:
+    from modules.db.vendor import get_repo
+except Exception as e:
+    print(f"[Analysis V2] Repository unavailable: {e}")
+    get_repo = None
+
 # 创建蓝图
 analysis_v2_bp = Blueprint('analysis_v2', __name__, url_prefix='/api/analysis/v2')
 
@@ -38,21 +65,350 @@ TEMPERATURE_ANOMALY_SUBTYPE = {
     'temperature_range_abnormal': '日温差异常',
 }
 
+# 工单模型与数据仓储在首次使用时创建，之后各请求共用
+_ticket_model = None
+_repo = None
+_singleton_lock = threading.Lock()
+
+
+def _get_ticket_model():
+    global _ticket_model
+    if _ticket_model is None:
+        with _singleton_lock:
+            if _ticket_model is None:
+                if TicketModel is None:
+                    raise RuntimeError('工单模块不可用')
+                _ticket_model = TicketModel()
+    return _ticket_model
+
+
+def _get_repo():
+    global _repo
+    if _repo is None:
+        with _singleton_lock:
+            if _repo is None:
+                if get_repo is None:
+                    raise RuntimeError('数据仓储不可用')
+                _repo = get_repo()
+    return _repo
+
+
+# 当前秒的 ISO 时间串缓存 [字符串, 秒]; 健康检查、错误响应等只需秒级精度
+_ISO_CACHE = ['', 0]
+
+
+def _now_iso() -> str:
+    now = int(time.time())
+    if now != _ISO_CACHE[1]:
+        _ISO_CACHE[:] = [datetime.fromtimestamp(now).isoformat(), now]
+    return _ISO_CACHE[0]
+
+
+# 未填写标题/描述时的默认模板
+_SETTLEMENT_TITLE = "[{}] 沉降异常预警"
+_SETTLEMENT_DESC = "监测点 {} 检测到异常: {}"
+_TEMP_TITLE = "[{}] 温度异常预警"
+_TEMP_DESC = "传感器 {} 检测到温度异常: {}"
+
+# 各类数据的工单参数
+TICKET_CONFIG = {
+    'settlement': {
+        'ticket_type': 'SETTLEMENT_ALERT',
+        'sub_types': SETTLEMENT_ANOMALY_SUBTYPE,
+        'default_sub_type': '监测点数据异常',
+        'assignee_env': 'SETTLEMENT_TICKET_ASSIGNEE',
+        'point_label': '监测点',
+        'point_key': 'point_id',
+        'log_name': 'Settlement',
+        'title_tmpl': _SETTLEMENT_TITLE,
+        'desc_tmpl': _SETTLEMENT_DESC,
+        'metadata': {},
+    },
+    'temperature': {
+        'ticket_type': 'TEMPERATURE_ALERT',
+        'sub_types': TEMPERATURE_ANOMALY_SUBTYPE,
+        'default_sub_type': '温度监测异常',
+        'assignee_env': 'TEMPERATURE_TICKET_ASSIGNEE',
+        'point_label': '传感器',
+        'point_key': 'sensor_id',
+        'log_name': 'Temperature',
+        'title_tmpl': _TEMP_TITLE,
+        'desc_tmpl': _TEMP_DESC,
+        'metadata': {'data_type': 'temperature'},
+    },
+}
+
+# 批量建单单次最多条数
+MAX_BULK_TICKETS = 200
+
+
+def _build_ticket_data(data: dict, kind: str) -> dict:
+    """
+    把前端提交的异常信息转换为 TicketModel 所需的工单数据
+
+    缺少监测点ID时抛出 ValueError
+    """
+    cfg = TICKET_CONFIG[kind]
+
+    # 获取参数
+    anomaly_id = data.get('anomaly_id', '')
+    point_id = data.get('point_id', '')
+    title = data.get('title', '')
+    description = data.get('description', '')
+    # 统一转为小写，保证 'HIGH'/'High' 也能映射到正确的优先级
+    severity = str(data.get('severity') or 'medium').lower()
+    anomaly_type = data.get('anomaly_type', '')
+    current_value = data.get('current_value')
+    threshold = data.get('threshold')
+    if isinstance(current_value, float) and math.isnan(current_value):
+        current_value = None
+    if isinstance(threshold, float) and math.isnan(threshold):
+        threshold = None
+
+    # 验证必填字段
+    if not point_id:
+        raise ValueError(f"缺少{cfg['point_label']}ID")
+    if not title:
+        title = cfg['title_tmpl'].format(point_id)
+    if not description:
+        description = cfg['desc_tmpl'].format(point_id, title)
+
+    assignee_id = (data.get('assignee_id')
+                   or os.environ.get(f"{cfg['assignee_env']}_ID")
+                   or 'monitoring_engineer')
+
+    return {
+        'title': title,
+        'description': description,
+        'ticket_type': cfg['ticket_type'],
+        'sub_type': cfg['sub_types'].get(anomaly_type, cfg['default_sub_type']),
+        'priority': SEVERITY_TO_PRIORITY.get(severity, 'MEDIUM'),
+        'status': 'PENDING',
+        'creator_id': data.get('creator_id', 'system'),
+        'creator_name': data.get('creator_name', '系统自动'),
+        'assignee_id': assignee_id,
+        'assignee_name': data.get('assignee_name') or os.environ.get(f"{cfg['assignee_env']}_NAME") or assignee_id,
+        'monitoring_point_id': point_id,
+        'current_value': current_value,
+        'threshold_value': threshold,
+        'alert_data': {
+            'anomaly_id': anomaly_id,
+            'anomaly_type': anomaly_type,
+            'severity': severity,
+            'detected_at': datetime.now().isoformat(),
+        },
+        'metadata': {
+            'source': 'analysis_v2',
+            'auto_created': True,
+            **cfg['metadata'],
+        }
+    }
+
+
+def _send_ticket_notifications(pairs):
+    """查询处理人邮箱并在一个 SMTP 会话内发送; 按 (工单, 邮箱) 去重"""
+    if ticket_notifier is None:
+        return
+    notifications = []
+    seen = set()
+    for ticket, ticket_data in pairs:
+        assignee_id = ticket.get('assignee_id') or ticket_data.get('assignee_id')
+        assignee_email = _get_user_email(assignee_id)
+        if not assignee_email:
+            continue
+        key = (ticket.get('id') or ticket.get('ticket_number'), assignee_email)
+        if key in seen:
+            continue
+        seen.add(key)
+        notifications.append((ticket, assignee_email))
+    if not notifications:
+        return
+    try:
+        result = ticket_notifier.notify_ticket_created_bulk(notifications)
+        if result.get('failed'):
+            print(f"[Analysis V2] Ticket email notify failed for: {result['failed']}")
+    except Exception as notify_err:
+        print(f"[Analysis V2] Ticket email notify failed: {notify_err}")
+
+
+def _notify_tickets_created(pairs):
+    """
+    发送建单通知; pairs 为 (ticket, ticket_data) 列表
+
+    在返回响应前同步发送: Serverless 实例在响应后可能被冻结或回收，后台线程中的邮件会无声丢失。
+    所有邮件共用一个 SMTP 会话，耗时基本只有一次连接
+    """
+    if pairs:
+        _send_ticket_notifications(pairs)
+
+
+def _create_ticket(kind: str, data: dict):
+    """创建单个工单并提交通知，返回 Flask 响应"""
+    cfg = TICKET_CONFIG[kind]
+    try:
+        ticket_model = _get_ticket_model()
+
+        if not data or not isinstance(data, dict):
+            return jsonify({'success': False, 'message': '请求数据不能为空'}), 400
+
+        send_email = data.get('send_email', True) is not False
+        try:
+            ticket_data = _build_ticket_data(data, kind)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        # 创建工单
+        ticket = ticket_model.create_ticket(ticket_data)
+        invalidate_analysis_cache()
+
+        try:
+            if send_email:
+                _notify_tickets_created([(ticket, ticket_data)])
+        except Exception as notify_err:
+            print(f"[Analysis V2] {cfg['log_name']} ticket email notify failed: {notify_err}")
+
+        return jsonify({
+            'success': True,
+            'message': '工单创建成功',
+            'data': {
+                'ticket_id': ticket.get('id'),
+                'ticket_number': ticket.get('ticket_number'),
+                cfg['point_key']: ticket_data['monitoring_point_id'],
+                'priority': ticket_data['priority'],
+            }
+        }), 201
+
+    except Exception as e:
+        print(f"[Analysis V2] Create {kind} ticket error: {e}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'message': f'创建工单失败: {str(e)}'}), 500
+
+
+# 分析结果缓存 (进程内): key -> (过期时间, 结果)
+# 看板轮询在 TTL 内直接返回缓存，不再重复拉取数据和计算
+ANALYSIS_CACHE_TTL = 60
+ANALYSIS_CACHE_MAXSIZE = 32
+_analysis_cache = {}
+_analysis_cache_lock = threading.Lock()
+_analysis_cache_version = 0
+
+
+def _cached(key, loader):
+    """按 key 缓存 loader() 的结果 ANALYSIS_CACHE_TTL 秒; 异常不缓存"""
+    full_key = (_analysis_cache_version,) + key
+    now = time.monotonic()
+    entry = _analysis_cache.get(full_key)
+    if entry and entry[0] > now:
+        return entry[1]
+    value = loader()
+    with _analysis_cache_lock:
+        if full_key[0] == _analysis_cache_version:
+            if full_key not in _analysis_cache and len(_analysis_cache) >= ANALYSIS_CACHE_MAXSIZE:
+                _analysis_cache.pop(next(iter(_analysis_cache)))
+            _analysis_cache[full_key] = (now + ANALYSIS_CACHE_TTL, value)
+    return value
+
+
+def invalidate_analysis_cache():
+    """使分析结果缓存失效 (创建工单后调用)"""
+    global _analysis_cache_version
+    with _analysis_cache_lock:
+        _analysis_cache_version += 1
+        _analysis_cache.clear()
+
+
+_SERVICE_CLASSES = {
+    'settlement': SettlementAnalysisService,
+    'temperature': TemperatureAnalysisService,
+}
+
+
+def _analyze(data_type: str) -> dict:
+    service_cls = _SERVICE_CLASSES[data_type]
+    if service_cls is None:
+        raise RuntimeError(f'{data_type} 分析服务不可用')
+    return service_cls().analyze().to_dict()
+
+
+def _cached_analysis(data_type: str) -> dict:
+    """完整分析结果 (已序列化为 dict)，异常/建议接口直接复用其中的列表"""
+    return _cached(('analyze', data_type), lambda: _analyze(data_type))
+
+
+def _anomaly_predicate(severity, anomaly_type):
+    """把实际传入的过滤条件合成一个判断函数; 无过滤条件时返回 None"""
+    checks = tuple((key, value) for key, value in (('severity', severity), ('anomaly_type', anomaly_type)) if value)
+    if not checks:
+        return None
+    if len(checks) == 1:
+        key, value = checks[0]
+        return lambda a: a[key] == value
+    return lambda a: all(a[key] == value for key, value in checks)
+
+
+def _filter_anomalies(anomalies, severity, anomaly_type):
+    """按严重程度/类型惰性过滤异常 dict，配合 islice 在取满 limit 条后停止"""
+    predicate = _anomaly_predicate(severity, anomaly_type)
+    return iter(anomalies) if predicate is None else filter(predicate, anomalies)
+
+
+# 用户邮箱缓存: user_id -> (过期时间, email)，未查到 (None) 也缓存，避免批量建单时反复查库
+USER_EMAIL_CACHE_TTL = 300
+USER_EMAIL_CACHE_MAXSIZE = 512
+_user_email_cache = {}
+_user_email_cache_lock = threading.Lock()
+
+
 def _get_user_email(user_id: str):
     if not user_id:
         return None
-    candidates = [
-        f"USER_EMAIL_{user_id}",
-        f"USER_EMAIL_{str(user_id).lower()}",
-        f"USER_EMAIL_{str(user_id).upper()}",
-    ]
-    for key in candidates:
-        value = os.environ.get(key)
-        if value:
-            return value
+    now = time.monotonic()
+    entry = _user_email_cache.get(user_id)
+    if entry and entry[0] > now:
+        return entry[1]
+    email = _lookup_user_email(user_id)
+    with _user_email_cache_lock:
+        if user_id not in _user_email_cache and len(_user_email_cache) >= USER_EMAIL_CACHE_MAXSIZE:
+            _user_email_cache.pop(next(iter(_user_email_cache)))
+        _user_email_cache[user_id] = (now + USER_EMAIL_CACHE_TTL, email)
+    return email
+
+
+def _clear_user_email_cache():
+    with _user_email_cache_lock:
+        _user_email_cache.clear()
+
+
+_get_user_email.cache_clear = _clear_user_email_cache
+
+
+_EMAIL_ENV_PREFIX = 'USER_EMAIL_'
+
+
+def _load_email_env() -> dict:
+    """环境变量 USER_EMAIL_<id> 快照: 小写 id -> email"""
+    return {
+        key[len(_EMAIL_ENV_PREFIX):].lower(): value
+        for key, value in os.environ.items()
+        if key.startswith(_EMAIL_ENV_PREFIX) and value
+    }
+
+
+_EMAIL_ENV = _load_email_env()
+
+
+def _refresh_email_env():
+    global _EMAIL_ENV
+    _EMAIL_ENV = _load_email_env()
+
+
+def _lookup_user_email(user_id: str):
+    """先查环境变量 USER_EMAIL_<id> (不区分大小写)，命中则不再访问数据库"""
+    value = _EMAIL_ENV.get(str(user_id).lower())
+    if value:
+        return value
     try:
-        from modules.db.vendor import get_repo
-        repo = get_repo()
+        repo = _get_repo()
         getter = getattr(repo, 'user_get_email', None)
         if callable(getter):
             return getter(user_id)
@@ -75,21 +431,15 @@ def get_settlement_analysis():
         - summary: 汇总信息
     """
     try:
-        from .settlement_service import SettlementAnalysisService
-
-        service = SettlementAnalysisService()
-        result = service.analyze()
-
-        return jsonify(result.to_dict())
+        return jsonify(_cached_analysis('settlement'))
 
     except Exception as e:
         print(f"[Analysis V2] Settlement analysis error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({
             'error': str(e),
             'data_type': 'settlement',
-            'analysis_time': datetime.now().isoformat(),
+            'analysis_time': _now_iso(),
             'stats': {'total_points': 0, 'anomaly_count': 0},
             'anomalies': [],
             'recommendations': [],
@@ -108,28 +458,21 @@ def get_settlement_anomalies():
         - limit: 返回数量限制
     """
     try:
-        from .settlement_service import SettlementAnalysisService
-
-        service = SettlementAnalysisService()
-        anomalies = service.detect_anomalies()
+        anomalies = _cached_analysis('settlement')['anomalies']
 
         # 应用过滤
         severity_filter = request.args.get('severity')
         type_filter = request.args.get('type')
         limit = request.args.get('limit', type=int)
 
-        if severity_filter:
-            anomalies = [a for a in anomalies if a.severity == severity_filter]
-
-        if type_filter:
-            anomalies = [a for a in anomalies if a.anomaly_type == type_filter]
-
-        if limit:
-            anomalies = anomalies[:limit]
+        anomalies = list(islice(
+            _filter_anomalies(anomalies, severity_filter, type_filter),
+            limit if limit and limit > 0 else None
+        ))
 
         return jsonify({
             'count': len(anomalies),
-            'anomalies': [a.to_dict() for a in anomalies],
+            'anomalies': anomalies,
         })
 
     except Exception as e:
@@ -143,15 +486,11 @@ def get_settlement_recommendations():
     仅获取沉降处置建议
     """
     try:
-        from .settlement_service import SettlementAnalysisService
-
-        service = SettlementAnalysisService()
-        anomalies = service.detect_anomalies()
-        recommendations = service.generate_recommendations(anomalies)
+        recommendations = _cached_analysis('settlement')['recommendations']
 
         return jsonify({
             'count': len(recommendations),
-            'recommendations': [r.to_dict() for r in recommendations],
+            'recommendations': recommendations,
         })
 
     except Exception as e:
@@ -177,21 +516,15 @@ def get_temperature_analysis():
         - summary: 汇总信息
     """
     try:
-        from .temperature_service import TemperatureAnalysisService
-
-        service = TemperatureAnalysisService()
-        result = service.analyze()
-
-        return jsonify(result.to_dict())
+        return jsonify(_cached_analysis('temperature'))
 
     except Exception as e:
         print(f"[Analysis V2] Temperature analysis error: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({
             'error': str(e),
             'data_type': 'temperature',
-            'analysis_time': datetime.now().isoformat(),
+            'analysis_time': _now_iso(),
             'stats': {'total_points': 0, 'anomaly_count': 0},
             'anomalies': [],
             'recommendations': [],
@@ -210,28 +543,21 @@ def get_temperature_anomalies():
         - limit: 返回数量限制
     """
     try:
-        from .temperature_service import TemperatureAnalysisService
-
-        service = TemperatureAnalysisService()
-        anomalies = service.detect_anomalies()
+        anomalies = _cached_analysis('temperature')['anomalies']
 
         # 应用过滤
         severity_filter = request.args.get('severity')
         type_filter = request.args.get('type')
         limit = request.args.get('limit', type=int)
 
-        if severity_filter:
-            anomalies = [a for a in anomalies if a.severity == severity_filter]
-
-        if type_filter:
-            anomalies = [a for a in anomalies if a.anomaly_type == type_filter]
-
-        if limit:
-            anomalies = anomalies[:limit]
+        anomalies = list(islice(
+            _filter_anomalies(anomalies, severity_filter, type_filter),
+            limit if limit and limit > 0 else None
+        ))
 
         return jsonify({
             'count': len(anomalies),
-            'anomalies': [a.to_dict() for a in anomalies],
+            'anomalies': anomalies,
         })
 
     except Exception as e:
@@ -245,15 +571,11 @@ def get_temperature_recommendations():
     仅获取温度处置建议
     """
     try:
-        from .temperature_service import TemperatureAnalysisService
-
-        service = TemperatureAnalysisService()
-        anomalies = service.detect_anomalies()
-        recommendations = service.generate_recommendations(anomalies)
+        recommendations = _cached_analysis('temperature')['recommendations']
 
         return jsonify({
             'count': len(recommendations),
-            'recommendations': [r.to_dict() for r in recommendations],
+            'recommendations': recommendations,
         })
 
     except Exception as e:
@@ -276,117 +598,33 @@ def create_temperature_ticket():
         - creator_id: 创建人ID (可选，默认 'system')
         - creator_name: 创建人名称 (可选，默认 '系统自动')
     """
-    try:
-        from modules.ticket_system.models.ticket import TicketModel
-        ticket_model = TicketModel()
-
-        data = request.get_json()
-        if not data:
-            return jsonify({'success': False, 'message': '请求数据不能为空'}), 400
-
-        # 获取参数
-        anomaly_id = data.get('anomaly_id', '')
-        point_id = data.get('point_id', '')
-        title = data.get('title', '')
-        description = data.get('description', '')
-        severity = data.get('severity', 'medium')
-        anomaly_type = data.get('anomaly_type', '')
-        creator_id = data.get('creator_id', 'system')
-        creator_name = data.get('creator_name', '系统自动')
-        send_email = data.get('send_email', True) is not False
-        current_value = data.get('current_value')
-        threshold = data.get('threshold')
-        if isinstance(current_value, float) and math.isnan(current_value):
-            current_value = None
-        if isinstance(threshold, float) and math.isnan(threshold):
-            threshold = None
-
-        # 验证必填字段
-        if not point_id:
-            return jsonify({'success': False, 'message': '缺少传感器ID'}), 400
-        if not title:
-            title = f"[{point_id}] 温度异常预警"
-
-        # 映射优先级
-        priority = SEVERITY_TO_PRIORITY.get(severity, 'MEDIUM')
-
-        # 映射子类型
-        sub_type = TEMPERATURE_ANOMALY_SUBTYPE.get(anomaly_type, '温度监测异常')
-
-        # 构建工单数据
-        ticket_data = {
-            'title': title,
-            'description': description or f"传感器 {point_id} 检测到温度异常: {title}",
-            'ticket_type': 'TEMPERATURE_ALERT',
-            'sub_type': sub_type,
-            'priority': priority,
-            'status': 'PENDING',
-            'creator_id': creator_id,
-            'creator_name': creator_name,
-            'assignee_id': data.get('assignee_id') or os.environ.get('TEMPERATURE_TICKET_ASSIGNEE_ID') or 'monitoring_engineer',
-            'assignee_name': data.get('assignee_name') or os.environ.get('TEMPERATURE_TICKET_ASSIGNEE_NAME') or (data.get('assignee_id') or os.environ.get('TEMPERATURE_TICKET_ASSIGNEE_ID') or 'monitoring_engineer'),
-            'monitoring_point_id': point_id,
-            'current_value': current_value,
-            'threshold_value': threshold,
-            'alert_data': {
-                'anomaly_id': anomaly_id,
-                'anomaly_type': anomaly_type,
-                'severity': severity,
-                'detected_at': datetime.now().isoformat(),
-            },
-            'metadata': {
-                'source': 'analysis_v2',
-                'auto_created': True,
-                'data_type': 'temperature',
-            }
-        }
-
-        # 创建工单
-        ticket = ticket_model.create_ticket(ticket_data)
-
-        try:
-            if send_email:
-                assignee_id = ticket.get('assignee_id') or ticket_data.get('assignee_id')
-                assignee_email = _get_user_email(assignee_id)
-                if assignee_email:
-                    from modules.ticket_system.services import ticket_notifier
-                    ticket_notifier.notify_ticket_created(ticket, assignee_email)
-        except Exception as notify_err:
-            print(f"[Analysis V2] Temperature ticket email notify failed: {notify_err}")
-
-        return jsonify({
-            'success': True,
-            'message': '工单创建成功',
-            'data': {
-                'ticket_id': ticket.get('id'),
-                'ticket_number': ticket.get('ticket_number'),
-                'sensor_id': point_id,
-                'priority': priority,
-            }
-        }), 201
-
-    except Exception as e:
-        print(f"[Analysis V2] Create temperature ticket error: {e}")
-        traceback.print_exc()
-        return jsonify({'success': False, 'message': f'创建工单失败: {str(e)}'}), 500
+    return _create_ticket('temperature', request.get_json(silent=True))
 
 
 # ============================================================
 # 通用接口
 # ============================================================
 
+def clear_analysis_caches():
+    """清空分析结果缓存和用户邮箱缓存，并重新读取 USER_EMAIL_* 环境变量 (数据导入完成后由导入流程调用，不对外暴露)"""
+    invalidate_analysis_cache()
+    _refresh_email_env()
+    _get_user_email.cache_clear()
+
+
 @analysis_v2_bp.route('/health', methods=['GET'])
 def health_check():
     """健康检查"""
     return jsonify({
         'status': 'healthy',
         'module': 'analysis_v2',
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': _now_iso(),
         'available_endpoints': [
             '/api/analysis/v2/settlement',
             '/api/analysis/v2/settlement/anomalies',
             '/api/analysis/v2/settlement/recommendations',
             '/api/analysis/v2/settlement/create-ticket',
+            '/api/analysis/v2/settlement/create-tickets',
             '/api/analysis/v2/temperature',
             '/api/analysis/v2/temperature/anomalies',
             '/api/analysis/v2/temperature/recommendations',
@@ -410,95 +648,70 @@ def create_ticket_from_anomaly():
         - creator_id: 创建人ID (可选，默认 'system')
         - creator_name: 创建人名称 (可选，默认 '系统自动')
     """
+    return _create_ticket('settlement', request.get_json(silent=True))
+
+
+@analysis_v2_bp.route('/settlement/create-tickets', methods=['POST'])
+def create_tickets_from_anomalies():
+    """
+    批量从异常创建工单 (一次请求、一次多行插入)
+
+    请求体:
+        - tickets: 异常列表，每项字段同 /settlement/create-ticket
+        - send_email: 是否发送通知邮件 (可选，默认 True)
+    """
     try:
-        from modules.ticket_system.models.ticket import TicketModel
-        ticket_model = TicketModel()
+        ticket_model = _get_ticket_model()
 
-        data = request.get_json()
-        if not data:
+        data = request.get_json(silent=True)
+        items = data.get('tickets') if isinstance(data, dict) else data
+        if not items or not isinstance(items, list):
             return jsonify({'success': False, 'message': '请求数据不能为空'}), 400
+        if len(items) > MAX_BULK_TICKETS:
+            return jsonify({'success': False, 'message': f'单次最多创建 {MAX_BULK_TICKETS} 个工单'}), 400
 
-        # 获取参数
-        anomaly_id = data.get('anomaly_id', '')
-        point_id = data.get('point_id', '')
-        title = data.get('title', '')
-        description = data.get('description', '')
-        severity = data.get('severity', 'medium')
-        anomaly_type = data.get('anomaly_type', '')
-        creator_id = data.get('creator_id', 'system')
-        creator_name = data.get('creator_name', '系统自动')
-        send_email = data.get('send_email', True) is not False
-        current_value = data.get('current_value')
-        threshold = data.get('threshold')
-        if isinstance(current_value, float) and math.isnan(current_value):
-            current_value = None
-        if isinstance(threshold, float) and math.isnan(threshold):
-            threshold = None
-
-        # 验证必填字段
-        if not point_id:
-            return jsonify({'success': False, 'message': '缺少监测点ID'}), 400
-        if not title:
-            title = f"[{point_id}] 沉降异常预警"
-
-        # 映射优先级
-        priority = SEVERITY_TO_PRIORITY.get(severity, 'MEDIUM')
-
-        # 映射子类型
-        sub_type = SETTLEMENT_ANOMALY_SUBTYPE.get(anomaly_type, '监测点数据异常')
-
-        # 构建工单数据
-        ticket_data = {
-            'title': title,
-            'description': description or f"监测点 {point_id} 检测到异常: {title}",
-            'ticket_type': 'SETTLEMENT_ALERT',
-            'sub_type': sub_type,
-            'priority': priority,
-            'status': 'PENDING',
-            'creator_id': creator_id,
-            'creator_name': creator_name,
-            'assignee_id': data.get('assignee_id') or os.environ.get('SETTLEMENT_TICKET_ASSIGNEE_ID') or 'monitoring_engineer',
-            'assignee_name': data.get('assignee_name') or os.environ.get('SETTLEMENT_TICKET_ASSIGNEE_NAME') or (data.get('assignee_id') or os.environ.get('SETTLEMENT_TICKET_ASSIGNEE_ID') or 'monitoring_engineer'),
-            'monitoring_point_id': point_id,
-            'current_value': current_value,
-            'threshold_value': threshold,
-            'alert_data': {
-                'anomaly_id': anomaly_id,
-                'anomaly_type': anomaly_type,
-                'severity': severity,
-                'detected_at': datetime.now().isoformat(),
-            },
-            'metadata': {
-                'source': 'analysis_v2',
-                'auto_created': True,
-            }
-        }
+        send_email = not isinstance(data, dict) or data.get('send_email', True) is not False
 
-        # 创建工单
-        ticket = ticket_model.create_ticket(ticket_data)
+        tickets_data = []
+        errors = []
+        for index, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError('工单数据格式错误')
+                tickets_data.append(_build_ticket_data(item, 'settlement'))
+            except ValueError as e:
+                errors.append({'index': index, 'message': str(e)})
+
+        if not tickets_data:
+            return jsonify({'success': False, 'message': '没有有效的工单数据', 'errors': errors}), 400
+
+        # 批量创建工单 (返回结果与 tickets_data 按 ticket_number 对齐)
+        tickets = ticket_model.bulk_create_tickets(tickets_data)
+        invalidate_analysis_cache()
+        pairs = [(ticket, ticket_data) for ticket, ticket_data in zip(tickets, tickets_data) if ticket]
 
         try:
             if send_email:
-                assignee_id = ticket.get('assignee_id') or ticket_data.get('assignee_id')
-                assignee_email = _get_user_email(assignee_id)
-                if assignee_email:
-                    from modules.ticket_system.services import ticket_notifier
-                    ticket_notifier.notify_ticket_created(ticket, assignee_email)
+                _notify_tickets_created(pairs)
         except Exception as notify_err:
-            print(f"[Analysis V2] Settlement ticket email notify failed: {notify_err}")
+            print(f"[Analysis V2] Bulk settlement ticket email notify failed: {notify_err}")
 
         return jsonify({
             'success': True,
-            'message': '工单创建成功',
-            'data': {
-                'ticket_id': ticket.get('id'),
-                'ticket_number': ticket.get('ticket_number'),
-                'point_id': point_id,
-                'priority': priority,
-            }
+            'message': f'成功创建 {len(pairs)} 个工单',
+            'data': [
+                {
+                    'ticket_id': ticket.get('id'),
+                    'ticket_number': ticket.get('ticket_number'),
+                    'point_id': ticket_data['monitoring_point_id'],
+                    'priority': ticket_data['priority'],
+                }
+                for ticket, ticket_data in pairs
+            ],
+            'errors': errors,
         }), 201
 
     except Exception as e:
-        print(f"[Analysis V2] Create ticket error: {e}")
+        print(f"[Analysis V2] Bulk create tickets error: {e}")
         traceback.print_exc()
-        return jsonify({'success': False, 'message': f'创建工单失败: {str(e)}'}), 500
+        return jsonify({'success': False, 'message': f'批量创建工单失败: {str(e)}'}), 500
@@ -5,11 +5,15 @@
 """
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field, asdict
+from itertools import count
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from typing import List, Dict, Any, Optional
 import json
+import uuid
+
+import numpy as np
 
 
 class SeverityLevel(Enum):
@@ -21,6 +25,17 @@ class SeverityLevel(Enum):
     NORMAL = "normal"        # 正常
 
 
+# 统计时直接使用字符串，避免循环中反复访问 Enum.value
+_SEV_CRITICAL = SeverityLevel.CRITICAL.value
+_SEV_HIGH = SeverityLevel.HIGH.value
+_SEV_MEDIUM = SeverityLevel.MEDIUM.value
+_SEV_LOW = SeverityLevel.LOW.value
+
+# 严重程度排序键: 数值越小越靠前，未知等级排在最后
+SEVERITY_RANK = {level.value: rank for rank, level in enumerate(SeverityLevel)}
+_UNKNOWN_SEVERITY_RANK = len(SEVERITY_RANK)
+
+
 class AnomalyType(Enum):
     """异常类型"""
     THRESHOLD_EXCEEDED = "threshold_exceeded"          # 超过阈值
@@ -39,7 +54,7 @@ class RecommendationPriority(Enum):
     LOW = "low"              # 低
 
 
-@dataclass
+@dataclass(slots=True)
 class AnomalyItem:
     """异常项"""
     id: str                                  # 唯一标识
@@ -56,12 +71,32 @@ class AnomalyItem:
     trend: Optional[str] = None              # 趋势方向
     related_points: List[str] = field(default_factory=list)  # 关联监测点
     metadata: Dict[str, Any] = field(default_factory=dict)   # 额外元数据
+    # 严重程度序号 (见 SEVERITY_RANK)，创建时计算，供排序和计数使用; 不参与序列化
+    severity_code: int = field(default=_UNKNOWN_SEVERITY_RANK, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.severity_code = SEVERITY_RANK.get(self.severity, _UNKNOWN_SEVERITY_RANK)
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {
+            'id': self.id,
+            'point_id': self.point_id,
+            'anomaly_type': self.anomaly_type,
+            'severity': self.severity,
+            'title': self.title,
+            'description': self.description,
+            'detected_at': self.detected_at,
+            'data_time': self.data_time,
+            'current_value': self.current_value,
+            'threshold': self.threshold,
+            'deviation': self.deviation,
+            'trend': self.trend,
+            'related_points': list(self.related_points),
+            'metadata': dict(self.metadata),
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class Recommendation:
     """处置建议"""
     id: str                                  # 唯一标识
@@ -75,10 +110,20 @@ class Recommendation:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {
+            'id': self.id,
+            'priority': self.priority,
+            'title': self.title,
+            'description': self.description,
+            'action_type': self.action_type,
+            'target_points': list(self.target_points),
+            'estimated_urgency': self.estimated_urgency,
+            'reference_anomalies': list(self.reference_anomalies),
+            'metadata': dict(self.metadata),
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class AnalysisStats:
     """分析统计"""
     total_points: int = 0                    # 总监测点数
@@ -91,10 +136,19 @@ class AnalysisStats:
     normal_count: int = 0                    # 正常数
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {
+            'total_points': self.total_points,
+            'analyzed_points': self.analyzed_points,
+            'anomaly_count': self.anomaly_count,
+            'critical_count': self.critical_count,
+            'high_count': self.high_count,
+            'medium_count': self.medium_count,
+            'low_count': self.low_count,
+            'normal_count': self.normal_count,
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class AnalysisResult:
     """分析结果"""
     data_type: str                           # 数据类型 (settlement/temperature/crack/vibration)
@@ -122,6 +176,9 @@ class BaseAnalysisService(ABC):
 
     def __init__(self, data_type: str):
         self.data_type = data_type
+        # 每个服务实例 (即每次分析) 生成一次随机前缀，之后的 ID 只需递增计数
+        self._run_id = uuid.uuid4().hex[:8]
+        self._id_counter = count()
 
     @abstractmethod
     def analyze(self) -> AnalysisResult:
@@ -139,14 +196,20 @@ class BaseAnalysisService(ABC):
         pass
 
     def _generate_id(self, prefix: str) -> str:
-        """生成唯一ID"""
-        import uuid
-        return f"{prefix}_{uuid.uuid4().hex[:8]}"
+        """生成唯一ID: {prefix}_{实例随机前缀}_{序号}"""
+        return f"{prefix}_{self._run_id}_{next(self._id_counter)}"
 
     def _get_current_time(self) -> str:
         """获取当前时间字符串"""
         return datetime.now().isoformat()
 
+    def _sort_by_severity(self, anomalies: List[AnomalyItem]) -> List[AnomalyItem]:
+        """按严重程度分桶排序 (O(N)，同级保持原有顺序，与稳定排序结果一致)"""
+        buckets = [[] for _ in range(_UNKNOWN_SEVERITY_RANK + 1)]
+        for a in anomalies:
+            buckets[a.severity_code].append(a)
+        return [a for bucket in buckets for a in bucket]
+
     def _calculate_stats(self, anomalies: List[AnomalyItem], total_points: int) -> AnalysisStats:
         """计算统计信息"""
         stats = AnalysisStats(
@@ -155,15 +218,12 @@ class BaseAnalysisService(ABC):
             anomaly_count=len(anomalies),
         )
 
-        for anomaly in anomalies:
-            if anomaly.severity == SeverityLevel.CRITICAL.value:
-                stats.critical_count += 1
-            elif anomaly.severity == SeverityLevel.HIGH.value:
-                stats.high_count += 1
-            elif anomaly.severity == SeverityLevel.MEDIUM.value:
-                stats.medium_count += 1
-            elif anomaly.severity == SeverityLevel.LOW.value:
-                stats.low_count += 1
-
-        stats.normal_count = total_points - len(set(a.point_id for a in anomalies))
+        codes = np.fromiter((a.severity_code for a in anomalies), dtype=np.int8, count=len(anomalies))
+        counts = np.bincount(codes, minlength=_UNKNOWN_SEVERITY_RANK + 1).tolist()
+        stats.critical_count = counts[SEVERITY_RANK[_SEV_CRITICAL]]
+        stats.high_count = counts[SEVERITY_RANK[_SEV_HIGH]]
+        stats.medium_count = counts[SEVERITY_RANK[_SEV_MEDIUM]]
+        stats.low_count = counts[SEVERITY_RANK[_SEV_LOW]]
+
+        stats.normal_count = total_points - len({a.point_id for a in anomalies}) if anomalies else total_points
         return stats
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+沉降分析数值核函数
+安装 numba 时 JIT 编译，并按监测点并行计算; 未安装时 HAS_NUMBA 为 False，由调用方走 NumPy 实现
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+# compute_point_stats 输出列: 每个监测点一行
+N_STATS = 9  # min, max, mean, std, slope, intercept, ss_res, ss_tot, max_abs_daily_change
+
+
+def _point_stats(values, offsets, daily_changes, dc_offsets, out):
+    """
+    values[offsets[i]:offsets[i+1]] 为第 i 个点按时间排序的数值，
+    daily_changes[dc_offsets[i]:dc_offsets[i+1]] 为其日变化量 (可为空)。
+    线性回归以序号 0..n-1 为自变量，与 settlement_service._linreg1 一致;
+    不足 2 个值时斜率为 0，没有值时整行为 NaN。
+    """
+    for i in prange(offsets.size - 1):
+        lo = offsets[i]
+        hi = offsets[i + 1]
+        n = hi - lo
+        if n == 0:
+            for k in range(N_STATS):
+                out[i, k] = np.nan
+            continue
+
+        v_min = values[lo]
+        v_max = values[lo]
+        total = 0.0
+        for j in range(lo, hi):
+            v = values[j]
+            if v < v_min:
+                v_min = v
+            if v > v_max:
+                v_max = v
+            total += v
+        mean = total / n
+
+        # Sxx 为闭式 n(n²-1)/12; SSres = SStot - slope·Sxy，省去第三遍循环
+        x_mean = (n - 1) / 2.0
+        sxy = 0.0
+        syy = 0.0
+        for j in range(lo, hi):
+            yc = values[j] - mean
+            sxy += ((j - lo) - x_mean) * yc
+            syy += yc * yc
+        slope = sxy / (n * (n * n - 1) / 12.0) if n >= 2 else 0.0
+        ss_res = max(syy - slope * sxy, 0.0)
+
+        max_dc = 0.0
+        for j in range(dc_offsets[i], dc_offsets[i + 1]):
+            dc = abs(daily_changes[j])
+            if dc > max_dc:
+                max_dc = dc
+
+        out[i, 0] = v_min
+        out[i, 1] = v_max
+        out[i, 2] = mean
+        out[i, 3] = math.sqrt(syy / n)
+        out[i, 4] = slope
+        out[i, 5] = mean - slope * x_mean
+        out[i, 6] = ss_res
+        out[i, 7] = syy
+        out[i, 8] = max_dc
+
+
+compute_point_stats = njit(parallel=True, fastmath=True)(_point_stats) if njit is not None else None
+HAS_NUMBA = compute_point_stats is not None
+
+
+def batch_point_stats(series_values, series_daily_changes):
+    """
+    把各点数组拼接成一维缓冲区后一次调用 JIT 核函数
+
+    返回每个点一行的 list[list[float]]，列顺序见 N_STATS
+    """
+    count = len(series_values)
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum([v.size for v in series_values], out=offsets[1:])
+    dc_offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum([d.size for d in series_daily_changes], out=dc_offsets[1:])
+
+    values = np.concatenate(series_values)
+    daily_changes = np.concatenate(series_daily_changes) if dc_offsets[-1] else np.zeros(0)
+    out = np.empty((count, N_STATS), dtype=np.float64)
+    compute_point_stats(values, offsets, daily_changes, dc_offsets, out)
+    return out.tolist()
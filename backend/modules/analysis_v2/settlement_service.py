@@ -4,13 +4,28 @@
 从原始数据实时计算异常检测、深度分析、建议生成
 """
 
+import json
 import os
+import threading
+import time
 import requests
 import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, NamedTuple, Optional
 from collections import defaultdict
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from .settlement_kernels import HAS_NUMBA, batch_point_stats
 from .base import (
     BaseAnalysisService,
     AnalysisResult,
@@ -19,9 +34,19 @@ from .base import (
     Recommendation,
     SeverityLevel,
     AnomalyType,
-    RecommendationPriority
+    RecommendationPriority,
+    SEVERITY_RANK,
 )
 
+# 向量化检测使用的严重程度序号 (与 SEVERITY_RANK 一致)
+_SEVERITIES = tuple(level.value for level in SeverityLevel)
+_RANK_CRITICAL = SEVERITY_RANK[SeverityLevel.CRITICAL.value]
+_RANK_HIGH = SEVERITY_RANK[SeverityLevel.HIGH.value]
+_RANK_MEDIUM = SEVERITY_RANK[SeverityLevel.MEDIUM.value]
+_RANK_LOW = SEVERITY_RANK[SeverityLevel.LOW.value]
+# 触发趋势异常的趋势类型: 显著下沉为中等，显著隆起为低
+_TREND_RANK = {'显著下沉': _RANK_MEDIUM, '显著隆起': _RANK_LOW}
+
 
 def _headers():
     """Supabase HTTP请求头"""
@@ -29,6 +54,7 @@ def _headers():
     h = {
         'apikey': anon,
         'Accept': 'application/json',
+        'Accept-Encoding': 'gzip',
     }
     if anon:
         h['Authorization'] = f'Bearer {anon}'
@@ -41,6 +67,280 @@ def _url(path):
     return f'{base}{path}'
 
 
+def _loads(content):
+    """解析 Supabase / Redis 返回的 JSON 字节 (有 orjson 时用 orjson)"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+# 共享会话: 复用到 Supabase 的 keep-alive 连接，429/5xx 自动退避重试
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4, pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504])
+))
+
+# (连接, 读取) 超时; 全量拉取数据较慢，读取超时放宽
+_TIMEOUT = (3, 30)
+
+
+# 监测点统计的跨请求缓存，按 processed_settlement_data 的数据版本 (写入触发器维护的修订号) 作键。
+# 配置 REDIS_URL 且安装了 redis 时存 Redis，多个 worker 共享；否则存进程内
+POINT_STATS_CACHE_TTL = 600
+_local_stats_cache = {}  # key -> (过期时间, point_stats)
+_local_stats_lock = threading.Lock()
+_redis_client = None
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None and redis is not None and os.environ.get('REDIS_URL'):
+        try:
+            _redis_client = redis.Redis.from_url(os.environ['REDIS_URL'], socket_timeout=1)
+        except Exception as e:
+            print(f"[SettlementAnalysisService] Redis unavailable: {e}")
+    return _redis_client
+
+
+def _data_revision() -> Optional[str]:
+    """
+    processed_settlement_data 的数据版本 (data_revisions 表，由触发器在每次写入时递增，见 09_analysis_v2_rpc.sql)
+
+    只读一行，不扫描数据表; 表未部署或请求失败时返回 None，此时不使用缓存
+    """
+    try:
+        r = _SESSION.get(
+            _url('/rest/v1/data_revisions?select=revision,updated_at&table_name=eq.processed_settlement_data'),
+            headers=_headers(),
+            timeout=_TIMEOUT
+        )
+        r.raise_for_status()
+        rows = _loads(r.content)
+        if not rows:
+            return None
+        return f"settlement_point_stats:{rows[0].get('revision')}:{rows[0].get('updated_at') or ''}"
+    except Exception as e:
+        print(f"[SettlementAnalysisService] Fetch data revision failed: {e}")
+        return None
+
+
+def _stats_cache_get(key: str) -> Optional[Dict[str, Dict]]:
+    client = _get_redis()
+    if client is not None:
+        try:
+            raw = client.get(key)
+            return _loads(raw) if raw else None
+        except Exception as e:
+            print(f"[SettlementAnalysisService] Redis get failed: {e}")
+    entry = _local_stats_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def _stats_cache_set(key: str, point_stats: Dict[str, Dict]):
+    client = _get_redis()
+    if client is not None:
+        try:
+            client.setex(key, POINT_STATS_CACHE_TTL, _dumps(point_stats))
+            return
+        except Exception as e:
+            print(f"[SettlementAnalysisService] Redis set failed: {e}")
+    with _local_stats_lock:
+        # 数据版本变化后旧键不会再命中，直接替换
+        _local_stats_cache.clear()
+        _local_stats_cache[key] = (time.monotonic() + POINT_STATS_CACHE_TTL, point_stats)
+
+
+# 并发拉取合并: 同一数据版本同时只有一个线程请求 Supabase，其余线程等待并共享结果;
+# 成功的结果在短时间窗口内继续复用 (共享对象，只读)
+FETCH_COALESCE_WINDOW = 5
+_inflight_fetches = {}  # key -> _PendingFetch
+_recent_fetches = {}    # key -> (fetched_at, rows)
+_fetch_lock = threading.Lock()
+
+
+class _PendingFetch:
+    __slots__ = ('done', 'rows')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.rows = None
+
+
+def _coalesced_fetch(key, fetch):
+    """执行 fetch() 并合并同一 key 的并发调用; fetch 失败时返回 None (不缓存)"""
+    with _fetch_lock:
+        entry = _recent_fetches.get(key)
+        if entry and time.monotonic() - entry[0] < FETCH_COALESCE_WINDOW:
+            return entry[1]
+        pending = _inflight_fetches.get(key)
+        leader = pending is None
+        if leader:
+            pending = _inflight_fetches[key] = _PendingFetch()
+
+    if not leader:
+        pending.done.wait()
+        return pending.rows
+
+    try:
+        pending.rows = fetch()
+    finally:
+        with _fetch_lock:
+            _inflight_fetches.pop(key, None)
+            # 只保留最近一次的结果，旧版本数据不再命中
+            _recent_fetches.clear()
+            if pending.rows is not None:
+                _recent_fetches[key] = (time.monotonic(), pending.rows)
+        pending.done.set()
+    return pending.rows
+
+
+# 全量拉取的分页大小 (Supabase 默认 max-rows 为 1000，单次请求超出部分会被截断)
+FETCH_PAGE_SIZE = 1000
+
+
+def _fetch_processed_rows() -> Optional[List[Dict]]:
+    """
+    拉取全部处理后的沉降数据，按时间排序
+
+    按 Range 分页请求，首页带 count=exact，由 Content-Range (start-end/total) 判断是否取完
+    """
+    url = _url('/rest/v1/processed_settlement_data?select=point_id,measurement_date,value,daily_change'
+               '&order=measurement_date.asc,point_id.asc')
+    rows = []
+    total = None
+    try:
+        while True:
+            h = _headers()
+            h['Range-Unit'] = 'items'
+            h['Range'] = f'{len(rows)}-{len(rows) + FETCH_PAGE_SIZE - 1}'
+            if total is None:
+                h['Prefer'] = 'count=exact'
+            r = _SESSION.get(url, headers=h, timeout=_TIMEOUT)
+            r.raise_for_status()
+            page = _loads(r.content)
+            rows.extend(page)
+
+            if total is None:
+                count = r.headers.get('Content-Range', '').rpartition('/')[2]
+                total = int(count) if count.isdigit() else -1
+            # 总数未知时以返回不足一页作为结束条件
+            if not page or (total >= 0 and len(rows) >= total) or (total < 0 and len(page) < FETCH_PAGE_SIZE):
+                return rows
+    except Exception as e:
+        print(f"[SettlementAnalysisService] Fetch processed data failed: {e}")
+        return None
+
+
+def _fetch_point_series_rows() -> Optional[List[Dict]]:
+    """
+    按监测点聚合、已按时间排序的序列 (settlement_point_series 视图，见 09_analysis_v2_rpc.sql)
+
+    视图未部署或请求失败时返回 None
+    """
+    try:
+        r = _SESSION.get(
+            _url('/rest/v1/settlement_point_series?select=point_id,record_count,first_date,last_date,vals,daily_changes'
+                 '&order=first_seen.asc,point_id.asc'),
+            headers=_headers(),
+            timeout=_TIMEOUT
+        )
+        if r.status_code != 200:
+            return None
+        return _loads(r.content)
+    except Exception as e:
+        print(f"[SettlementAnalysisService] Fetch point series failed: {e}")
+        return None
+
+
+# 回归自变量 0..n-1 的共享缓冲区，按需扩容，调用方只取切片视图
+_ramp = np.arange(256, dtype=np.float64)
+
+
+def _ramp_view(n: int) -> np.ndarray:
+    global _ramp
+    if n > _ramp.size:
+        _ramp = np.arange(max(n, 2 * _ramp.size), dtype=np.float64)
+    return _ramp[:n]
+
+
+def _linreg1(y: np.ndarray):
+    """
+    对 y 关于 x = 0..n-1 做一元线性回归 (闭式解，等价于 np.polyfit(x, y, 1))
+
+    每个点只分配一个中心化临时数组: Sxx 用 n(n²-1)/12 直接算，
+    由于 Σyc = 0，Sxy = x·yc; 残差平方和 SSres = SStot - slope·Sxy。
+    不足 2 个值时 Sxx 为 0，斜率按 0 处理
+
+    返回 (slope, intercept, ss_res, ss_tot)
+    """
+    n = y.size
+    if n < 2:
+        return 0.0, (float(y[0]) if n else float('nan')), 0.0, 0.0
+    x_mean = (n - 1) / 2.0
+    y_mean = float(y.mean())
+    yc = y - y_mean
+    sxy = float(_ramp_view(n).dot(yc))
+    ss_tot = float(yc.dot(yc))
+    slope = sxy / (n * (n * n - 1) / 12.0)
+    ss_res = max(ss_tot - slope * sxy, 0.0)
+    return slope, y_mean - slope * x_mean, ss_res, ss_tot
+
+
+def _array_stats(values: np.ndarray, daily_changes: np.ndarray):
+    """
+    单个点的基本统计 + 线性回归 (NumPy 实现，与 settlement_kernels 输出列一致)
+
+    返回 (min, max, mean, std, slope, intercept, ss_res, ss_tot, max_abs_daily_change)
+    """
+    slope, intercept, ss_res, ss_tot = _linreg1(values)
+    return (
+        float(values.min()),
+        float(values.max()),
+        float(values.mean()),
+        float(values.std()),
+        slope,
+        intercept,
+        ss_res,
+        ss_tot,
+        float(np.abs(daily_changes).max()) if daily_changes.size else 0,
+    )
+
+
+# 趋势分类: np.digitize 分箱后按下标取标签，最后一项为边界值 (±0.01) 和 NaN 对应的 "轻微变化"
+_TREND_BINS = np.array([-0.05, -0.01, 0.01, 0.05])
+_TREND_LABELS = ("显著下沉", "轻微下沉", "无显著趋势", "轻微隆起", "显著隆起", "轻微变化")
+
+
+def _classify_trends(slopes: np.ndarray) -> List[str]:
+    """
+    批量确定趋势类型，与逐点判断规则一致:
+    |k|<0.01 无显著趋势; k<-0.05 显著下沉; k<-0.01 轻微下沉; k>0.05 显著隆起; k>0.01 轻微隆起; 其余为轻微变化
+    """
+    idx = np.digitize(slopes, _TREND_BINS)
+    # digitize 为左闭右开区间，修正与原规则不一致的边界点
+    idx[slopes == 0.05] = 3
+    idx[(np.abs(slopes) == 0.01) | np.isnan(slopes)] = 5
+    return [_TREND_LABELS[i] for i in idx.tolist()]
+
+
+class _AnomalyGroups(NamedTuple):
+    """一次遍历得到的异常分组"""
+    by_severity: Dict[str, List[AnomalyItem]]
+    by_type: Dict[str, List[AnomalyItem]]
+    points_by_severity: Dict[str, set]
+    points_by_type: Dict[str, set]
+    points: set                          # 所有异常涉及的监测点
+
+
 class SettlementAnalysisService(BaseAnalysisService):
     """沉降分析服务 - 从原始数据实时计算"""
 
@@ -59,33 +359,60 @@ class SettlementAnalysisService(BaseAnalysisService):
         super().__init__('settlement')
         self._processed_data = None
         self._point_stats = None
+        self._anomaly_groups = None  # (anomalies, _AnomalyGroups)
+        self._revision = None        # 本次分析的数据版本，用于合并并发拉取
 
     def _fetch_processed_data(self) -> List[Dict]:
         """获取处理后的沉降数据"""
         if self._processed_data is not None:
             return self._processed_data
 
-        try:
-            # 获取所有处理后的数据，按时间排序
-            r = requests.get(
-                _url('/rest/v1/processed_settlement_data?select=point_id,measurement_date,value,daily_change,cumulative_change&order=measurement_date.asc'),
-                headers=_headers()
-            )
-            r.raise_for_status()
-            self._processed_data = r.json()
-            return self._processed_data
-        except Exception as e:
-            print(f"[SettlementAnalysisService] Fetch processed data failed: {e}")
+        rows = _coalesced_fetch(('processed', self._revision), _fetch_processed_rows)
+        if rows is None:
             return []
+        self._processed_data = rows
+        return rows
 
     def _calculate_point_stats(self) -> Dict[str, Dict]:
-        """从原始数据计算每个监测点的统计信息"""
+        """每个监测点的统计信息; 数据版本未变时直接复用缓存，不再拉取全量数据"""
         if self._point_stats is not None:
             return self._point_stats
 
+        key = self._revision = _data_revision()
+        if key:
+            cached = _stats_cache_get(key)
+            if cached is not None:
+                self._point_stats = cached
+                return cached
+
+        point_stats = self._compute_point_stats()
+        if key and point_stats:
+            _stats_cache_set(key, point_stats)
+        return point_stats
+
+    def _fetch_point_series(self) -> Optional[List[Dict]]:
+        """按监测点聚合的序列; 视图未部署或请求失败时返回 None，由调用方回退到拉取全量数据"""
+        return _coalesced_fetch(('point_series', self._revision), _fetch_point_series_rows)
+
+    def _point_series(self) -> List[tuple]:
+        """每个有效监测点的 (point_id, first_date, last_date, values, daily_changes)，数值为 float64 数组"""
+        rows = self._fetch_point_series()
+        if rows is not None:
+            series = []
+            for row in rows:
+                vals = row.get('vals') or []
+                if (row.get('record_count') or 0) < 2 or len(vals) < 2:
+                    continue
+                series.append((
+                    row['point_id'],
+                    row.get('first_date'),
+                    row.get('last_date'),
+                    np.asarray(vals, dtype=np.float64),
+                    np.asarray(row.get('daily_changes') or [], dtype=np.float64),
+                ))
+            return series
+
         processed_data = self._fetch_processed_data()
-        if not processed_data:
-            return {}
 
         # 按监测点分组
         point_data = defaultdict(list)
@@ -94,8 +421,8 @@ class SettlementAnalysisService(BaseAnalysisService):
             if point_id:
                 point_data[point_id].append(record)
 
-        self._point_stats = {}
-
+        # 按时间排序，每个点的数值只转换一次为 float64 数组
+        series = []
         for point_id, records in point_data.items():
             if len(records) < 2:
                 continue
@@ -103,54 +430,62 @@ class SettlementAnalysisService(BaseAnalysisService):
             # 按时间排序
             records.sort(key=lambda x: x.get('measurement_date', ''))
 
-            # 提取数值
-            values = []
-            dates = []
-            daily_changes = []
-            cumulative_changes = []
+            valued = [r for r in records if r.get('value') is not None]
+            if len(valued) < 2:
+                continue
+            values = np.fromiter((float(r['value']) for r in valued), dtype=np.float64, count=len(valued))
+            daily_changes = np.fromiter(
+                (float(r['daily_change']) for r in records if r.get('daily_change') is not None),
+                dtype=np.float64
+            )
+            series.append((
+                point_id,
+                valued[0].get('measurement_date'),
+                valued[-1].get('measurement_date'),
+                values,
+                daily_changes,
+            ))
+        return series
+
+    def _compute_point_stats(self) -> Dict[str, Dict]:
+        """从原始数据计算每个监测点的统计信息"""
+        series = self._point_series()
+        if not series:
+            return {}
 
-            for r in records:
-                val = r.get('value')
-                if val is not None:
-                    values.append(float(val))
-                    dates.append(r.get('measurement_date'))
+        self._point_stats = {}
 
-                dc = r.get('daily_change')
-                if dc is not None:
-                    daily_changes.append(float(dc))
+        # 计算基本统计与线性回归 (有 numba 时所有点一次并行计算)
+        if HAS_NUMBA and series:
+            rows = batch_point_stats([s[3] for s in series], [s[4] for s in series])
+        else:
+            rows = (_array_stats(values, daily_changes) for _, _, _, values, daily_changes in series)
 
-                cc = r.get('cumulative_change')
-                if cc is not None:
-                    cumulative_changes.append(float(cc))
+        rows = list(rows)
 
-            if len(values) < 2:
-                continue
+        # 趋势类型按斜率整列分类 (少于 3 个数据点时斜率记为 0)
+        trend_types = _classify_trends(np.array(
+            [row[4] if s[3].size >= 3 else 0.0 for s, row in zip(series, rows)], dtype=np.float64
+        ))
 
-            # 计算基本统计
-            min_val = min(values)
-            max_val = max(values)
-            avg_val = sum(values) / len(values)
-            std_val = np.std(values) if len(values) > 1 else 0
+        for (point_id, first_date, last_date, values, _), row, trend_type in zip(series, rows, trend_types):
+            min_val, max_val, avg_val, std_val, fit_slope, intercept, ss_res, ss_tot, max_daily_rate = row
+            n = values.size
 
             # 计算累计变化（相对于第一个值）
-            initial_value = values[0]
-            current_value = values[-1]
+            initial_value = float(values[0])
+            current_value = float(values[-1])
             total_change = current_value - initial_value
 
             # 计算日变化率（使用线性回归）
-            if len(values) >= 3:
-                x = np.arange(len(values))
-                slope, intercept = np.polyfit(x, values, 1)
+            if n >= 3:
+                slope = fit_slope
 
                 # 计算R方
-                y_pred = slope * x + intercept
-                ss_res = np.sum((np.array(values) - y_pred) ** 2)
-                ss_tot = np.sum((np.array(values) - avg_val) ** 2)
                 r_squared = 1 - (ss_res / ss_tot) if ss_tot > 0 else 0
 
                 # 预测30天后的值
-                days_in_data = len(values)
-                predicted_30d = slope * (days_in_data + 30) + intercept
+                predicted_30d = slope * (n + 30) + intercept
                 predicted_change_30d = predicted_30d - current_value
             else:
                 slope = 0
@@ -158,20 +493,6 @@ class SettlementAnalysisService(BaseAnalysisService):
                 predicted_30d = current_value
                 predicted_change_30d = 0
 
-            # 确定趋势类型
-            if abs(slope) < 0.01:
-                trend_type = "无显著趋势"
-            elif slope < -0.05:
-                trend_type = "显著下沉"
-            elif slope < -0.01:
-                trend_type = "轻微下沉"
-            elif slope > 0.05:
-                trend_type = "显著隆起"
-            elif slope > 0.01:
-                trend_type = "轻微隆起"
-            else:
-                trend_type = "轻微变化"
-
             # 确定告警级别
             if total_change <= self.THRESHOLDS['cumulative_alert']:
                 alert_level = "alert"
@@ -182,9 +503,6 @@ class SettlementAnalysisService(BaseAnalysisService):
             else:
                 alert_level = "normal"
 
-            # 计算最大日变化率
-            max_daily_rate = max(abs(dc) for dc in daily_changes) if daily_changes else 0
-
             self._point_stats[point_id] = {
                 'point_id': point_id,
                 'min_value': min_val,
@@ -201,10 +519,10 @@ class SettlementAnalysisService(BaseAnalysisService):
                 'alert_level': alert_level,
                 'predicted_value_30d': predicted_30d,
                 'predicted_change_30d': predicted_change_30d,
-                'data_count': len(values),
+                'data_count': n,
                 'last_value': current_value,
-                'first_date': dates[0] if dates else None,
-                'last_date': dates[-1] if dates else None,
+                'first_date': first_date,
+                'last_date': last_date,
             }
 
         return self._point_stats
@@ -214,7 +532,9 @@ class SettlementAnalysisService(BaseAnalysisService):
         point_stats = self._calculate_point_stats()
 
         # 检测异常
-        anomalies = self.detect_anomalies()
+        # 本次分析的所有异常共用同一检测时间
+        now = self._get_current_time()
+        anomalies = self.detect_anomalies(now)
 
         # 生成建议
         recommendations = self.generate_recommendations(anomalies)
@@ -227,7 +547,7 @@ class SettlementAnalysisService(BaseAnalysisService):
 
         return AnalysisResult(
             data_type=self.data_type,
-            analysis_time=self._get_current_time(),
+            analysis_time=now,
             stats=stats,
             anomalies=anomalies,
             recommendations=recommendations,
@@ -239,74 +559,87 @@ class SettlementAnalysisService(BaseAnalysisService):
             }
         )
 
-    def detect_anomalies(self) -> List[AnomalyItem]:
-        """从原始数据检测所有类型的异常"""
+    def detect_anomalies(self, now: Optional[str] = None) -> List[AnomalyItem]:
+        """从原始数据检测所有类型的异常; now 为检测时间，缺省时取当前时间"""
+        now = now or self._get_current_time()
         anomalies = []
         point_stats = self._calculate_point_stats()
-
-        for point_id, stats in point_stats.items():
-            trend_slope = stats.get('trend_slope', 0)
-            total_change = stats.get('total_change', 0)
-            predicted_value_30d = stats.get('predicted_value_30d')
-            predicted_change_30d = stats.get('predicted_change_30d')
-            trend_type = stats.get('trend_type', '')
-
-            # 1. 检测日沉降速率异常
-            rate_anomaly = self._check_rate_anomaly(point_id, trend_slope, stats)
-            if rate_anomaly:
-                anomalies.append(rate_anomaly)
-
-            # 2. 检测累计沉降异常
-            cumulative_anomaly = self._check_cumulative_anomaly(point_id, total_change, stats)
-            if cumulative_anomaly:
-                anomalies.append(cumulative_anomaly)
-
-            # 3. 检测预测预警
-            if predicted_value_30d is not None:
-                # 预测值需要考虑当前值+预测变化
-                future_cumulative = total_change + (predicted_change_30d or 0)
-                prediction_anomaly = self._check_prediction_anomaly(
-                    point_id, future_cumulative, predicted_change_30d, stats
-                )
-                if prediction_anomaly:
-                    anomalies.append(prediction_anomaly)
-
-            # 4. 检测趋势异常
-            if trend_type and '显著' in trend_type:
-                trend_anomaly = self._check_trend_anomaly(point_id, trend_type, trend_slope, stats)
-                if trend_anomaly:
-                    anomalies.append(trend_anomaly)
+        if not point_stats:
+            return anomalies
+
+        stats_list = list(point_stats.values())
+        point_ids = list(point_stats.keys())
+        th = self.THRESHOLDS
+
+        # 各检测项的阈值判断在整列数组上一次完成，结果为严重程度序号 (-1 表示无异常)
+        slope = np.array([s.get('trend_slope', 0) for s in stats_list], dtype=np.float64)
+        total = np.array([s.get('total_change', 0) for s in stats_list], dtype=np.float64)
+        has_pred = np.array([s.get('predicted_value_30d') is not None for s in stats_list])
+        pred_change = np.array([s.get('predicted_change_30d') or 0 for s in stats_list], dtype=np.float64)
+
+        # 1. 日沉降速率
+        abs_rate = np.abs(slope)
+        rate_rank = np.select(
+            [abs_rate >= th['daily_rate_critical'], abs_rate >= th['daily_rate_high'], abs_rate >= th['daily_rate_medium']],
+            [_RANK_CRITICAL, _RANK_HIGH, _RANK_MEDIUM], default=-1,
+        )
+        # 2. 累计沉降
+        cum_rank = np.select(
+            [total <= th['cumulative_alert'], total <= th['cumulative_warning']],
+            [_RANK_CRITICAL, _RANK_HIGH], default=-1,
+        )
+        # 3. 预测预警: 当前累计 + 预测变化
+        future = total + pred_change
+        pred_rank = np.select(
+            [has_pred & (future <= th['prediction_30d_alert']), has_pred & (future <= th['prediction_30d_warning'])],
+            [_RANK_HIGH, _RANK_MEDIUM], default=-1,
+        )
+        # 4. 趋势
+        trend_rank = np.array([_TREND_RANK.get(s.get('trend_type') or '', -1) for s in stats_list])
+
+        flagged = np.flatnonzero((rate_rank >= 0) | (cum_rank >= 0) | (pred_rank >= 0) | (trend_rank >= 0))
+        if flagged.size == 0:
+            return anomalies
+
+        rate_rank = rate_rank.tolist()
+        cum_rank = cum_rank.tolist()
+        pred_rank = pred_rank.tolist()
+        trend_rank = trend_rank.tolist()
+        future = future.tolist()
+
+        # 只为命中的监测点构建异常项，顺序与逐点检测一致
+        for i in flagged.tolist():
+            point_id = point_ids[i]
+            stats = stats_list[i]
+            if rate_rank[i] >= 0:
+                anomalies.append(self._rate_anomaly(
+                    point_id, _SEVERITIES[rate_rank[i]], stats.get('trend_slope', 0), stats, now))
+            if cum_rank[i] >= 0:
+                anomalies.append(self._cumulative_anomaly(
+                    point_id, _SEVERITIES[cum_rank[i]], stats.get('total_change', 0), stats, now))
+            if pred_rank[i] >= 0:
+                anomalies.append(self._prediction_anomaly(
+                    point_id, _SEVERITIES[pred_rank[i]], future[i], stats.get('predicted_change_30d'), stats, now))
+            if trend_rank[i] >= 0:
+                anomalies.append(self._trend_anomaly(
+                    point_id, _SEVERITIES[trend_rank[i]], stats['trend_type'], stats.get('trend_slope', 0), stats, now))
 
         # 按严重程度排序
-        severity_order = {
-            SeverityLevel.CRITICAL.value: 0,
-            SeverityLevel.HIGH.value: 1,
-            SeverityLevel.MEDIUM.value: 2,
-            SeverityLevel.LOW.value: 3,
-            SeverityLevel.NORMAL.value: 4,
-        }
-        anomalies.sort(key=lambda x: severity_order.get(x.severity, 5))
-
-        return anomalies
+        return self._sort_by_severity(anomalies)
 
-    def _check_rate_anomaly(self, point_id: str, trend_slope: float, stats: Dict) -> Optional[AnomalyItem]:
-        """检查沉降速率异常"""
+    def _rate_anomaly(self, point_id: str, severity: str, trend_slope: float, stats: Dict, detected_at: str) -> AnomalyItem:
+        """构建沉降速率异常"""
         abs_rate = abs(trend_slope)
 
-        if abs_rate >= self.THRESHOLDS['daily_rate_critical']:
-            severity = SeverityLevel.CRITICAL.value
+        if severity == SeverityLevel.CRITICAL.value:
             title = f"[{point_id}] 沉降速率严重超标"
             description = f"日沉降速率 {trend_slope:.4f} mm/day，超过严重阈值 {self.THRESHOLDS['daily_rate_critical']} mm/day"
-        elif abs_rate >= self.THRESHOLDS['daily_rate_high']:
-            severity = SeverityLevel.HIGH.value
+        elif severity == SeverityLevel.HIGH.value:
             title = f"[{point_id}] 沉降速率偏高"
             description = f"日沉降速率 {trend_slope:.4f} mm/day，超过高风险阈值 {self.THRESHOLDS['daily_rate_high']} mm/day"
-        elif abs_rate >= self.THRESHOLDS['daily_rate_medium']:
-            severity = SeverityLevel.MEDIUM.value
+        else:
             title = f"[{point_id}] 沉降速率需关注"
             description = f"日沉降速率 {trend_slope:.4f} mm/day，超过中等阈值 {self.THRESHOLDS['daily_rate_medium']} mm/day"
-        else:
-            return None
 
         return AnomalyItem(
             id=self._generate_id('rate'),
@@ -315,7 +648,7 @@ class SettlementAnalysisService(BaseAnalysisService):
             severity=severity,
             title=title,
             description=description,
-            detected_at=self._get_current_time(),
+            detected_at=detected_at,
             current_value=trend_slope,
             threshold=self.THRESHOLDS['daily_rate_critical'] if severity == SeverityLevel.CRITICAL.value else self.THRESHOLDS['daily_rate_high'],
             deviation=abs_rate,
@@ -328,18 +661,14 @@ class SettlementAnalysisService(BaseAnalysisService):
             }
         )
 
-    def _check_cumulative_anomaly(self, point_id: str, total_change: float, stats: Dict) -> Optional[AnomalyItem]:
-        """检查累计沉降异常"""
-        if total_change <= self.THRESHOLDS['cumulative_alert']:
-            severity = SeverityLevel.CRITICAL.value
+    def _cumulative_anomaly(self, point_id: str, severity: str, total_change: float, stats: Dict, detected_at: str) -> AnomalyItem:
+        """构建累计沉降异常"""
+        if severity == SeverityLevel.CRITICAL.value:
             title = f"[{point_id}] 累计沉降超过报警值"
             description = f"累计沉降已达 {total_change:.2f} mm，超过报警阈值 {self.THRESHOLDS['cumulative_alert']} mm"
-        elif total_change <= self.THRESHOLDS['cumulative_warning']:
-            severity = SeverityLevel.HIGH.value
+        else:
             title = f"[{point_id}] 累计沉降超过警戒值"
             description = f"累计沉降已达 {total_change:.2f} mm，超过警戒阈值 {self.THRESHOLDS['cumulative_warning']} mm"
-        else:
-            return None
 
         return AnomalyItem(
             id=self._generate_id('cum'),
@@ -348,7 +677,7 @@ class SettlementAnalysisService(BaseAnalysisService):
             severity=severity,
             title=title,
             description=description,
-            detected_at=self._get_current_time(),
+            detected_at=detected_at,
             current_value=total_change,
             threshold=self.THRESHOLDS['cumulative_alert'] if severity == SeverityLevel.CRITICAL.value else self.THRESHOLDS['cumulative_warning'],
             metadata={
@@ -359,18 +688,14 @@ class SettlementAnalysisService(BaseAnalysisService):
             }
         )
 
-    def _check_prediction_anomaly(self, point_id: str, future_cumulative: float, predicted_change: Optional[float], stats: Dict) -> Optional[AnomalyItem]:
-        """检查预测预警"""
-        if future_cumulative <= self.THRESHOLDS['prediction_30d_alert']:
-            severity = SeverityLevel.HIGH.value
+    def _prediction_anomaly(self, point_id: str, severity: str, future_cumulative: float, predicted_change: Optional[float], stats: Dict, detected_at: str) -> AnomalyItem:
+        """构建预测预警"""
+        if severity == SeverityLevel.HIGH.value:
             title = f"[{point_id}] 30天预测超过报警值"
             description = f"30天后预测累计沉降 {future_cumulative:.2f} mm，将超过报警阈值"
-        elif future_cumulative <= self.THRESHOLDS['prediction_30d_warning']:
-            severity = SeverityLevel.MEDIUM.value
+        else:
             title = f"[{point_id}] 30天预测超过警戒值"
             description = f"30天后预测累计沉降 {future_cumulative:.2f} mm，将超过警戒阈值"
-        else:
-            return None
 
         return AnomalyItem(
             id=self._generate_id('pred'),
@@ -379,7 +704,7 @@ class SettlementAnalysisService(BaseAnalysisService):
             severity=severity,
             title=title,
             description=description,
-            detected_at=self._get_current_time(),
+            detected_at=detected_at,
             current_value=future_cumulative,
             threshold=self.THRESHOLDS['prediction_30d_alert'] if severity == SeverityLevel.HIGH.value else self.THRESHOLDS['prediction_30d_warning'],
             metadata={
@@ -389,18 +714,14 @@ class SettlementAnalysisService(BaseAnalysisService):
             }
         )
 
-    def _check_trend_anomaly(self, point_id: str, trend_type: str, trend_slope: Optional[float], stats: Dict) -> Optional[AnomalyItem]:
-        """检查趋势异常"""
-        if '显著下沉' in trend_type:
-            severity = SeverityLevel.MEDIUM.value
+    def _trend_anomaly(self, point_id: str, severity: str, trend_type: str, trend_slope: Optional[float], stats: Dict, detected_at: str) -> AnomalyItem:
+        """构建趋势异常"""
+        if severity == SeverityLevel.MEDIUM.value:
             title = f"[{point_id}] 检测到显著下沉趋势"
             description = f"监测点呈现{trend_type}，日沉降速率 {trend_slope:.4f} mm/day" if trend_slope else f"监测点呈现{trend_type}"
-        elif '显著隆起' in trend_type:
-            severity = SeverityLevel.LOW.value
+        else:
             title = f"[{point_id}] 检测到显著隆起趋势"
             description = f"监测点呈现{trend_type}，需关注异常隆起原因"
-        else:
-            return None
 
         return AnomalyItem(
             id=self._generate_id('trend'),
@@ -409,7 +730,7 @@ class SettlementAnalysisService(BaseAnalysisService):
             severity=severity,
             title=title,
             description=description,
-            detected_at=self._get_current_time(),
+            detected_at=detected_at,
             trend='down' if '下沉' in trend_type else 'up',
             metadata={
                 'trend_type': trend_type,
@@ -418,18 +739,40 @@ class SettlementAnalysisService(BaseAnalysisService):
             }
         )
 
+    def _group_anomalies(self, anomalies: List[AnomalyItem]) -> _AnomalyGroups:
+        """按严重程度和类型分组 (一次遍历); 同一异常列表的结果在建议和汇总间复用"""
+        if self._anomaly_groups is not None and self._anomaly_groups[0] is anomalies:
+            return self._anomaly_groups[1]
+
+        by_severity = {level.value: [] for level in SeverityLevel}
+        by_type = defaultdict(list)
+        points_by_severity = {level.value: set() for level in SeverityLevel}
+        points_by_type = defaultdict(set)
+        points = set()
+        for a in anomalies:
+            by_severity.setdefault(a.severity, []).append(a)
+            by_type[a.anomaly_type].append(a)
+            points_by_severity.setdefault(a.severity, set()).add(a.point_id)
+            points_by_type[a.anomaly_type].add(a.point_id)
+            points.add(a.point_id)
+
+        groups = _AnomalyGroups(by_severity, by_type, points_by_severity, points_by_type, points)
+        self._anomaly_groups = (anomalies, groups)
+        return groups
+
     def generate_recommendations(self, anomalies: List[AnomalyItem]) -> List[Recommendation]:
         """基于异常生成处置建议"""
         recommendations = []
 
         # 统计各严重程度的异常
-        critical_anomalies = [a for a in anomalies if a.severity == SeverityLevel.CRITICAL.value]
-        high_anomalies = [a for a in anomalies if a.severity == SeverityLevel.HIGH.value]
-        medium_anomalies = [a for a in anomalies if a.severity == SeverityLevel.MEDIUM.value]
+        groups = self._group_anomalies(anomalies)
+        critical_anomalies = groups.by_severity[SeverityLevel.CRITICAL.value]
+        high_anomalies = groups.by_severity[SeverityLevel.HIGH.value]
+        medium_anomalies = groups.by_severity[SeverityLevel.MEDIUM.value]
 
         # 1. 严重异常建议
         if critical_anomalies:
-            critical_points = list(set(a.point_id for a in critical_anomalies))
+            critical_points = list(groups.points_by_severity[SeverityLevel.CRITICAL.value])
             recommendations.append(Recommendation(
                 id=self._generate_id('rec'),
                 priority=RecommendationPriority.URGENT.value,
@@ -443,7 +786,7 @@ class SettlementAnalysisService(BaseAnalysisService):
 
         # 2. 高风险异常建议
         if high_anomalies:
-            high_points = list(set(a.point_id for a in high_anomalies))
+            high_points = list(groups.points_by_severity[SeverityLevel.HIGH.value])
             recommendations.append(Recommendation(
                 id=self._generate_id('rec'),
                 priority=RecommendationPriority.HIGH.value,
@@ -456,9 +799,9 @@ class SettlementAnalysisService(BaseAnalysisService):
             ))
 
         # 3. 预测预警建议
-        prediction_anomalies = [a for a in anomalies if a.anomaly_type == AnomalyType.PREDICTION_WARNING.value]
+        prediction_anomalies = groups.by_type.get(AnomalyType.PREDICTION_WARNING.value, [])
         if prediction_anomalies:
-            pred_points = list(set(a.point_id for a in prediction_anomalies))
+            pred_points = list(groups.points_by_type[AnomalyType.PREDICTION_WARNING.value])
             recommendations.append(Recommendation(
                 id=self._generate_id('rec'),
                 priority=RecommendationPriority.MEDIUM.value,
@@ -471,7 +814,7 @@ class SettlementAnalysisService(BaseAnalysisService):
 
         # 4. 中等风险建议
         if medium_anomalies and not critical_anomalies and not high_anomalies:
-            medium_points = list(set(a.point_id for a in medium_anomalies))
+            medium_points = list(groups.points_by_severity[SeverityLevel.MEDIUM.value])
             recommendations.append(Recommendation(
                 id=self._generate_id('rec'),
                 priority=RecommendationPriority.LOW.value,
@@ -520,15 +863,16 @@ class SettlementAnalysisService(BaseAnalysisService):
                 total_changes.append(stats['total_change'])
 
         avg_slope = sum(slopes) / len(slopes) if slopes else 0
+        groups = self._group_anomalies(anomalies)
         max_settlement = min(total_changes) if total_changes else 0
 
         return {
             'total_points': len(point_stats),
-            'anomaly_points': len(set(a.point_id for a in anomalies)),
+            'anomaly_points': len(groups.points),
             'trend_distribution': dict(trend_distribution),
             'alert_distribution': dict(alert_distribution),
             'avg_daily_rate': round(avg_slope, 4),
             'max_cumulative_settlement': round(max_settlement, 2),
-            'critical_count': len([a for a in anomalies if a.severity == SeverityLevel.CRITICAL.value]),
-            'high_count': len([a for a in anomalies if a.severity == SeverityLevel.HIGH.value]),
+            'critical_count': len(groups.by_severity[SeverityLevel.CRITICAL.value]),
+            'high_count': len(groups.by_severity[SeverityLevel.HIGH.value]),
         }
@@ -381,16 +381,7 @@ class TemperatureAnalysisService(BaseAnalysisService):
                     anomalies.append(trend_anomaly)
 
         # 按严重程度排序
-        severity_order = {
-            SeverityLevel.CRITICAL.value: 0,
-            SeverityLevel.HIGH.value: 1,
-            SeverityLevel.MEDIUM.value: 2,
-            SeverityLevel.LOW.value: 3,
-            SeverityLevel.NORMAL.value: 4,
-        }
-        anomalies.sort(key=lambda x: severity_order.get(x.severity, 5))
-
-        return anomalies
+        return self._sort_by_severity(anomalies)
 
     def _check_high_temp_anomaly(self, sensor_id: str, current_max: float, stats: Dict) -> Optional[AnomalyItem]:
         """检查高温异常"""
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, '..', '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from modules.analysis_v2.settlement_kernels import HAS_NUMBA, batch_point_stats
+from modules.analysis_v2.settlement_service import _array_stats, _classify_trends, _linreg1
+
+
+def _polyfit_reference(y):
+    """np.polyfit 版本的 (slope, intercept, ss_res, ss_tot)"""
+    x = np.arange(y.size, dtype=np.float64)
+    slope, intercept = np.polyfit(x, y, 1)
+    residuals = y - (slope * x + intercept)
+    yc = y - y.mean()
+    return slope, intercept, float(residuals.dot(residuals)), float(yc.dot(yc))
+
+
+class LinearRegressionTest(unittest.TestCase):
+    def test_linreg1_matches_polyfit(self):
+        rng = np.random.default_rng(0)
+        # 长度从小到大，覆盖 _ramp 缓冲区扩容
+        for n in (2, 3, 5, 30, 120, 1000):
+            y = rng.uniform(-5, 5) + rng.uniform(-0.2, 0.2) * np.arange(n) + rng.normal(0, 0.1, n)
+            np.testing.assert_allclose(_linreg1(y), _polyfit_reference(y), rtol=1e-9, atol=1e-9)
+
+    def test_linreg1_exact_line(self):
+        slope, intercept, ss_res, ss_tot = _linreg1(np.array([1.0, 3.0, 5.0, 7.0]))
+        self.assertAlmostEqual(slope, 2.0)
+        self.assertAlmostEqual(intercept, 1.0)
+        self.assertAlmostEqual(ss_res, 0.0)
+        self.assertAlmostEqual(ss_tot, 20.0)
+
+    def test_linreg1_single_value(self):
+        self.assertEqual(_linreg1(np.array([3.0])), (0.0, 3.0, 0.0, 0.0))
+
+    @unittest.skipUnless(HAS_NUMBA, 'numba 未安装')
+    def test_kernel_matches_numpy_stats(self):
+        rng = np.random.default_rng(1)
+        series = [rng.normal(0, 1, n) for n in (1, 2, 3, 30, 120)]
+        daily = [rng.normal(0, 0.1, n - 1) if n > 1 else np.zeros(0) for n in (1, 2, 3, 30, 120)]
+        rows = batch_point_stats(series, daily)
+        for row, values, changes in zip(rows, series, daily):
+            np.testing.assert_allclose(row, _array_stats(values, changes), rtol=1e-9, atol=1e-9)
+
+    @unittest.skipUnless(HAS_NUMBA, 'numba 未安装')
+    def test_kernel_empty_series(self):
+        rows = batch_point_stats([np.zeros(0), np.array([2.0, 4.0])], [np.zeros(0), np.zeros(0)])
+        self.assertTrue(all(np.isnan(rows[0])))
+        self.assertAlmostEqual(rows[1][4], 2.0)
+
+
+class ClassifyTrendsTest(unittest.TestCase):
+    def test_boundary_values(self):
+        cases = [
+            (0.0, '无显著趋势'),
+            (0.0099, '无显著趋势'),
+            (-0.0099, '无显著趋势'),
+            (0.01, '轻微变化'),
+            (-0.01, '轻微变化'),
+            (0.0101, '轻微隆起'),
+            (-0.0101, '轻微下沉'),
+            (0.05, '轻微隆起'),
+            (-0.05, '轻微下沉'),
+            (0.0501, '显著隆起'),
+            (-0.0501, '显著下沉'),
+            (float('nan'), '轻微变化'),
+            (float('inf'), '显著隆起'),
+            (float('-inf'), '显著下沉'),
+        ]
+        slopes = np.array([slope for slope, _ in cases])
+        self.assertEqual(_classify_trends(slopes), [label for _, label in cases])
+
+    def test_matches_scalar_rule(self):
+        def scalar_rule(k):
+            if abs(k) < 0.01:
+                return '无显著趋势'
+            if k < -0.05:
+                return '显著下沉'
+            if k < -0.01:
+                return '轻微下沉'
+            if k > 0.05:
+                return '显著隆起'
+            if k > 0.01:
+                return '轻微隆起'
+            return '轻微变化'
+
+        slopes = np.random.default_rng(2).uniform(-0.1, 0.1, 2000)
+        self.assertEqual(_classify_trends(slopes), [scalar_rule(k) for k in slopes.tolist()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -66,7 +66,7 @@ from modules.api.vibration_handler import vibration_bp
 from modules.ticket_system.api import ticket_bp, user_bp
 
 # 二级数据分析模块
-from modules.analysis_v2.api import analysis_v2_bp
+from modules.analysis_v2.api import analysis_v2_bp, clear_analysis_caches
 
 # 温度V2模块
 try:
@@ -103,10 +103,32 @@ except Exception as e:
 # =========================================================
 app = Flask(__name__, static_folder='../../static', template_folder='../../templates')
 CORS(app)  # 允许跨域请求
+# 路由末尾斜杠可有可无，避免 /api/xxx/ 触发 308 重定向多一次往返（需在定义路由之前设置）
+app.url_map.strict_slashes = False
 
 # 配置 Flask 使用 UTF-8 编码
 app.config['JSON_AS_ASCII'] = False
 app.config['JSON_SORT_KEYS'] = False
+# jsonify 改用 orjson 序列化（Flask 2.2 以下没有 JSON provider，保持默认）
+try:
+    from modules.api.json_provider import OrjsonProvider
+    app.json = OrjsonProvider(app)
+except ImportError:
+    pass
+# Flask 2.3+ 不再读取上面的配置项，直接设置 JSON provider（中文按UTF-8输出，不转义为\uXXXX）
+if hasattr(app, 'json'):
+    app.json.ensure_ascii = False
+    app.json.sort_keys = False
+
+# JSON 响应压缩（flask-compress 为可选依赖，未安装时跳过）
+try:
+    from flask_compress import Compress
+    app.config['COMPRESS_MIMETYPES'] = ['application/json']
+    app.config['COMPRESS_LEVEL'] = 6
+    app.config['COMPRESS_MIN_SIZE'] = 500
+    Compress(app)
+except ImportError:
+    pass
 
 IS_VERCEL = os.environ.get('VERCEL') == '1'
 if IS_VERCEL:
@@ -641,6 +663,7 @@ def process_uploaded_file(task_id, file_path):
         success = update_monitoring_points()
         if not success: raise Exception("更新坐标失败")
 
+        clear_analysis_caches()
         task['status'] = 'completed'
         task['message'] = '数据处理完成'
         task['updated_at'] = datetime.now().isoformat()
@@ -867,6 +890,7 @@ def process_temperature_file(task_id, file_path):
         success = process_temperature_data()
         if not success: raise Exception("处理失败")
 
+        clear_analysis_caches()
         task['status'] = 'completed'
         task['message'] = '温度数据处理完成'
         task['updated_at'] = datetime.now().isoformat()
@@ -1,5 +1,4 @@
 import pandas as pd
-import pyodbc
 import mysql.connector
 from sqlalchemy import create_engine, text
 import os
@@ -13,6 +12,12 @@ from modules.database.db_config import db_config
 
 def import_mdb_to_mysql(mdb_path):
     """从MDB文件导入温度数据到MySQL数据库"""
+    # pyodbc 仅在导入MDB时需要，延迟导入避免拖慢服务启动
+    try:
+        import pyodbc
+    except ImportError:
+        raise RuntimeError("pyodbc 不可用：服务器环境不支持 MDB/ACCDB 导入")
+
     print(f"开始从MDB文件导入温度数据: {mdb_path}")
 
     try:
@@ -25,6 +30,8 @@ def import_mdb_to_mysql(mdb_path):
         conn_str = f"Driver={{Microsoft Access Driver (*.mdb, *.accdb)}};DBQ={mdb_path}"
         access_conn = pyodbc.connect(conn_str)
         access_cursor = access_conn.cursor()
+        # 每次ODBC往返取多行，避免默认arraysize=1逐行获取
+        access_cursor.arraysize = 1000
         
         # 创建MySQL数据库连接
         engine = create_engine(
@@ -120,37 +127,27 @@ def import_mdb_to_mysql(mdb_path):
         
         try:
             print(f"正在执行查询: {data_query}")
-            # 为了避免内存问题，分批读取数据
+            # 为了避免内存问题，分批读取数据：只执行一次查询，用fetchmany流式获取
+            # (Access不支持OFFSET-FETCH分页语法)
             batch_size = 50000
-            offset = 0
             total_imported = 0
-            
+
+            access_cursor.arraysize = batch_size
+            access_cursor.execute(data_query)
+            # 获取列名
+            columns = [column[0] for column in access_cursor.description]
+
             while True:
-                batch_query = f"{data_query} OFFSET {offset} ROWS FETCH NEXT {batch_size} ROWS ONLY"
-                try:
-                    access_cursor.execute(batch_query)
-                except Exception as e:
-                    # 如果不支持OFFSET-FETCH语法，尝试使用TOP
-                    if offset == 0:
-                        batch_query = f"SELECT TOP {batch_size} DID, SID, DataTime, S1, S2, R1, R2, IsWarning FROM Data ORDER BY DataTime DESC"
-                        access_cursor.execute(batch_query)
-                    else:
-                        print(f"警告: 分批查询不支持，已导入前 {total_imported} 条记录")
-                        break
-                
-                batch_data = access_cursor.fetchall()
+                batch_data = access_cursor.fetchmany(batch_size)
                 if not batch_data:
                     break
-                
-                # 获取列名
-                columns = [column[0] for column in access_cursor.description]
-                
+
                 # 创建DataFrame
                 data_df = pd.DataFrame.from_records(batch_data, columns=columns)
-                
+
                 # 转换日期格式
                 data_df['DataTime'] = pd.to_datetime(data_df['DataTime'])
-                
+
                 # 重命名列以符合我们的标准
                 data_df.rename(columns={
                     'DataTime': 'measurement_date',
@@ -159,17 +156,16 @@ def import_mdb_to_mysql(mdb_path):
                     'S1': 'value1',       # 其他测量值
                     'S2': 'value2'        # 其他测量值
                 }, inplace=True)
-                
+
                 # 保存到MySQL
                 data_df.to_sql('raw_temperature_data', engine, if_exists='append' if total_imported > 0 else 'replace', index=False)
-                
+
                 total_imported += len(data_df)
                 print(f"已导入 {total_imported} 条温度数据记录")
-                
-                offset += batch_size
+
                 if len(batch_data) < batch_size:
                     break
-            
+
             print(f"成功导入总计 {total_imported} 条温度数据到 raw_temperature_data 表")
             
         except Exception as e:
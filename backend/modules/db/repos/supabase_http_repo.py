@@ -323,6 +323,15 @@ class SupabaseHttpRepo:
         rows = r.json()
         return rows[0] if isinstance(rows, list) and rows else {}
 
+    def tickets_create_batch(self, rows):
+        if not rows:
+            return []
+        h = _headers(); h['Prefer'] = 'return=representation'
+        r = requests.post(_url('/rest/v1/tickets'), headers=h, json=rows)
+        r.raise_for_status()
+        created = r.json()
+        return created if isinstance(created, list) else []
+
     def ticket_get_by_id(self, ticket_id):
         r = requests.get(_url(f'/rest/v1/tickets?select=*&id=eq.{ticket_id}'), headers=_headers())
         r.raise_for_status()
@@ -41,49 +41,52 @@ class TicketModel:
     def _ensure_table_exists(self):
         return
 
+    def _build_insert_data(self, ticket_data: Dict[str, Any]) -> Dict[str, Any]:
+        """生成工单编号、截止时间，整理为 tickets 表的插入行"""
+        ticket_number = generate_ticket_number()
+
+        now = datetime.datetime.now()
+        due_at_dt = self._parse_due_datetime(ticket_data.get('due_at') or ticket_data.get('due_date'))
+        if due_at_dt is None:
+            due_in_days = ticket_data.get('due_in_days')
+            if due_in_days is not None and str(due_in_days).strip() != "":
+                try:
+                    due_in_days = float(due_in_days)
+                except Exception:
+                    due_in_days = None
+            if due_in_days is not None:
+                due_at_dt = now + datetime.timedelta(days=due_in_days)
+        if due_at_dt is None:
+            due_at_dt = now + datetime.timedelta(days=2)
+        due_at = due_at_dt.isoformat()
+
+        return {
+            'ticket_number': ticket_number,
+            'title': ticket_data.get('title', ''),
+            'description': ticket_data.get('description', ''),
+            'ticket_type': ticket_data.get('ticket_type'),
+            'sub_type': ticket_data.get('sub_type'),
+            'priority': ticket_data.get('priority', 'MEDIUM'),
+            'status': ticket_data.get('status', 'PENDING'),
+            'creator_id': ticket_data.get('creator_id'),
+            'creator_name': ticket_data.get('creator_name'),
+            'assignee_id': ticket_data.get('assignee_id'),
+            'assignee_name': ticket_data.get('assignee_name'),
+            'monitoring_point_id': ticket_data.get('monitoring_point_id'),
+            'location_info': ticket_data.get('location_info'),
+            'equipment_id': ticket_data.get('equipment_id'),
+            'threshold_value': ticket_data.get('threshold_value'),
+            'current_value': ticket_data.get('current_value'),
+            'alert_data': ticket_data.get('alert_data', {}),
+            'due_at': due_at,
+            'attachment_paths': ticket_data.get('attachment_paths', []),
+            'metadata': ticket_data.get('metadata', {})
+        }
+
     def create_ticket(self, ticket_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            # 生成工单编号
-            ticket_number = generate_ticket_number()
-
-            now = datetime.datetime.now()
-            due_at_dt = self._parse_due_datetime(ticket_data.get('due_at') or ticket_data.get('due_date'))
-            if due_at_dt is None:
-                due_in_days = ticket_data.get('due_in_days')
-                if due_in_days is not None and str(due_in_days).strip() != "":
-                    try:
-                        due_in_days = float(due_in_days)
-                    except Exception:
-                        due_in_days = None
-                if due_in_days is not None:
-                    due_at_dt = now + datetime.timedelta(days=due_in_days)
-            if due_at_dt is None:
-                due_at_dt = now + datetime.timedelta(days=2)
-            due_at = due_at_dt.isoformat()
-
             # 准备插入数据
-            insert_data = {
-                'ticket_number': ticket_number,
-                'title': ticket_data.get('title', ''),
-                'description': ticket_data.get('description', ''),
-                'ticket_type': ticket_data.get('ticket_type'),
-                'sub_type': ticket_data.get('sub_type'),
-                'priority': ticket_data.get('priority', 'MEDIUM'),
-                'status': ticket_data.get('status', 'PENDING'),
-                'creator_id': ticket_data.get('creator_id'),
-                'creator_name': ticket_data.get('creator_name'),
-                'assignee_id': ticket_data.get('assignee_id'),
-                'assignee_name': ticket_data.get('assignee_name'),
-                'monitoring_point_id': ticket_data.get('monitoring_point_id'),
-                'location_info': ticket_data.get('location_info'),
-                'equipment_id': ticket_data.get('equipment_id'),
-                'threshold_value': ticket_data.get('threshold_value'),
-                'current_value': ticket_data.get('current_value'),
-                'alert_data': ticket_data.get('alert_data', {}),
-                'due_at': due_at,
-                'attachment_paths': ticket_data.get('attachment_paths', []),
-                'metadata': ticket_data.get('metadata', {})
-            }
+            insert_data = self._build_insert_data(ticket_data)
             repo = get_repo()
             created = repo.ticket_create(insert_data)
             return created
@@ -92,6 +95,28 @@ class TicketModel:
             print(f"创建工单失败: {e}")
             raise
 
+    def bulk_create_tickets(self, tickets_data: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        批量创建工单，仓储支持时一次多行 INSERT，否则逐条创建
+
+        返回列表与 tickets_data 一一对应 (按 ticket_number 匹配，不依赖返回行的顺序)，
+        未返回的行对应位置为 None
+        """
+        try:
+            if not tickets_data:
+                return []
+            rows = [self._build_insert_data(t) for t in tickets_data]
+            repo = get_repo()
+            bulk = getattr(repo, 'tickets_create_batch', None)
+            if not callable(bulk):
+                return [repo.ticket_create(row) for row in rows]
+            created = {ticket.get('ticket_number'): ticket for ticket in bulk(rows) if ticket}
+            return [created.get(row['ticket_number']) for row in rows]
+
+        except Exception as e:
+            print(f"批量创建工单失败: {e}")
+            raise
+
     def get_tickets(self, filters: Optional[Dict[str, Any]] = None,
                    limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
         try:
@@ -9,7 +9,7 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import Header
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import logging
 
 from ..config import TICKET_PRIORITY, TICKET_STATUS, TICKET_TYPES
@@ -60,6 +60,22 @@ class EmailService:
             logger.error(f"[ERROR] 连接 SMTP 服务器失败: {e}")
             raise
 
+    def _build_message(self, to: str, subject: str, body: str, html_body: Optional[str] = None) -> str:
+        """Build a MIME message string"""
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"{self.config.smtp_from_name} <{self.config.smtp_from}>"
+        msg['To'] = to
+        msg['Subject'] = Header(subject, 'utf-8')
+
+        # Attach plain text body
+        msg.attach(MIMEText(body, 'plain', 'utf-8'))
+
+        # Attach HTML body if provided
+        if html_body:
+            msg.attach(MIMEText(html_body, 'html', 'utf-8'))
+
+        return msg.as_string()
+
     def send_email(self, to: str, subject: str, body: str, html_body: Optional[str] = None) -> bool:
         """
         Send an email
@@ -78,21 +94,11 @@ class EmailService:
             return False
 
         try:
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"{self.config.smtp_from_name} <{self.config.smtp_from}>"
-            msg['To'] = to
-            msg['Subject'] = Header(subject, 'utf-8')
-
-            # Attach plain text body
-            msg.attach(MIMEText(body, 'plain', 'utf-8'))
-
-            # Attach HTML body if provided
-            if html_body:
-                msg.attach(MIMEText(html_body, 'html', 'utf-8'))
+            message = self._build_message(to, subject, body, html_body)
 
             # Send email
             server = self._get_connection()
-            server.sendmail(self.config.smtp_from, [to], msg.as_string())
+            server.sendmail(self.config.smtp_from, [to], message)
             server.quit()
 
             logger.info(f"[OK] 邮件已发送至 {to}: {subject}")
@@ -102,6 +108,48 @@ class EmailService:
             logger.error(f"[ERROR] 发送邮件失败 {to}: {e}")
             return False
 
+    def send_emails(self, messages: List[Dict]) -> Dict:
+        """
+        Send several different emails over a single SMTP session
+
+        Args:
+            messages: List of dicts with to, subject, body and optional html_body
+
+        Returns:
+            Dict with success and failed recipient lists
+        """
+        results = {'success': [], 'failed': []}
+        if not messages:
+            return results
+        if not self.config.is_configured():
+            logger.warning("[WARN] 邮件服务未配置，已跳过发送")
+            results['failed'] = [m['to'] for m in messages]
+            return results
+
+        try:
+            server = self._get_connection()
+        except Exception:
+            results['failed'] = [m['to'] for m in messages]
+            return results
+
+        try:
+            for m in messages:
+                try:
+                    message = self._build_message(m['to'], m['subject'], m['body'], m.get('html_body'))
+                    server.sendmail(self.config.smtp_from, [m['to']], message)
+                    logger.info(f"[OK] 邮件已发送至 {m['to']}: {m['subject']}")
+                    results['success'].append(m['to'])
+                except Exception as e:
+                    logger.error(f"[ERROR] 发送邮件失败 {m['to']}: {e}")
+                    results['failed'].append(m['to'])
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+        return results
+
     def send_batch_emails(self, recipients: List[str], subject: str, body: str, html_body: Optional[str] = None) -> Dict:
         """
         Send emails to multiple recipients
@@ -362,12 +410,8 @@ class TicketEmailNotifier:
         }
         return colors.get(priority, '#333')
 
-    def notify_ticket_created(self, ticket: Dict, assignee_email: Optional[str] = None) -> bool:
-        """Send notification for newly created ticket"""
-        if not assignee_email:
-            logger.info("[INFO] 未配置处理人邮箱，已跳过新工单通知")
-            return False
-
+    def _ticket_created_template(self, ticket: Dict) -> Dict[str, str]:
+        """Render the ticket_created template for a ticket"""
         ticket_type_code = self._norm(ticket.get('ticket_type', ''))
         priority_code = self._norm(ticket.get('priority', 'MEDIUM'))
 
@@ -383,7 +427,15 @@ class TicketEmailNotifier:
             'description': ticket.get('description', '暂无描述')
         }
 
-        template = self._get_email_template('ticket_created', context)
+        return self._get_email_template('ticket_created', context)
+
+    def notify_ticket_created(self, ticket: Dict, assignee_email: Optional[str] = None) -> bool:
+        """Send notification for newly created ticket"""
+        if not assignee_email:
+            logger.info("[INFO] 未配置处理人邮箱，已跳过新工单通知")
+            return False
+
+        template = self._ticket_created_template(ticket)
         return self.email_service.send_email(
             assignee_email,
             template['subject'],
@@ -391,6 +443,21 @@ class TicketEmailNotifier:
             template['html_body']
         )
 
+    def notify_ticket_created_bulk(self, notifications: List[Tuple[Dict, str]]) -> Dict:
+        """Send new-ticket notifications for (ticket, assignee_email) pairs over one SMTP session"""
+        messages = []
+        for ticket, assignee_email in notifications:
+            if not assignee_email:
+                continue
+            template = self._ticket_created_template(ticket)
+            messages.append({
+                'to': assignee_email,
+                'subject': template['subject'],
+                'body': template['body'],
+                'html_body': template['html_body'],
+            })
+        return self.email_service.send_emails(messages)
+
     def notify_ticket_assigned(self, ticket: Dict, assignee_email: str) -> bool:
         """Send notification when ticket is assigned"""
         ticket_type_code = self._norm(ticket.get('ticket_type', ''))
@@ -0,0 +1,271 @@
+-- -*- coding: utf-8 -*-
+-- Supabase/PostgreSQL functions for Advanced Analysis
+-- Description: Server-side helpers called through /rest/v1/rpc/<name>
+-- Depends on: 05_advanced_analysis.sql
+
+-- =====================================================
+-- Bulk upserts for seed data (data_import.py)
+-- Each call takes a JSON array of rows and upserts it in one statement.
+-- Returns the number of rows written.
+-- =====================================================
+
+-- geological_layers needs a natural key for ON CONFLICT.
+-- Earlier plain-insert imports may have left duplicate layer_numbers; this
+-- script refuses to continue rather than deleting rows. Review them, then
+-- run the one-off cleanup by hand (keeps the oldest row of each layer):
+--
+--   DELETE FROM geological_layers a
+--   USING geological_layers b
+--   WHERE a.layer_number = b.layer_number
+--     AND a.layer_id > b.layer_id;
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM geological_layers
+        WHERE layer_number IS NOT NULL
+        GROUP BY layer_number
+        HAVING COUNT(*) > 1
+    ) THEN
+        RAISE EXCEPTION 'geological_layers has duplicate layer_number values; '
+            'remove them (see the one-off DELETE above) before adding the unique key';
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'geological_layers_layer_number_key'
+    ) THEN
+        ALTER TABLE geological_layers
+            ADD CONSTRAINT geological_layers_layer_number_key UNIQUE (layer_number);
+    END IF;
+END $$;
+
+CREATE OR REPLACE FUNCTION upsert_geological_layers(payload JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH upserted AS (
+        INSERT INTO geological_layers (
+            layer_number, layer_name, depth_top, depth_bottom, thickness, unit_weight,
+            cohesion, friction_angle, compression_modulus, poisson_ratio, color, description
+        )
+        SELECT
+            r.layer_number, r.layer_name, r.depth_top, r.depth_bottom, r.thickness, r.unit_weight,
+            r.cohesion, r.friction_angle, r.compression_modulus, r.poisson_ratio,
+            COALESCE(r.color, '#cccccc'), r.description
+        FROM jsonb_to_recordset(payload) AS r(
+            layer_number VARCHAR(20),
+            layer_name VARCHAR(100),
+            depth_top NUMERIC,
+            depth_bottom NUMERIC,
+            thickness NUMERIC,
+            unit_weight NUMERIC,
+            cohesion NUMERIC,
+            friction_angle NUMERIC,
+            compression_modulus NUMERIC,
+            poisson_ratio NUMERIC,
+            color VARCHAR(20),
+            description TEXT
+        )
+        ON CONFLICT (layer_number) DO UPDATE SET
+            layer_name = EXCLUDED.layer_name,
+            depth_top = EXCLUDED.depth_top,
+            depth_bottom = EXCLUDED.depth_bottom,
+            thickness = EXCLUDED.thickness,
+            unit_weight = EXCLUDED.unit_weight,
+            cohesion = EXCLUDED.cohesion,
+            friction_angle = EXCLUDED.friction_angle,
+            compression_modulus = EXCLUDED.compression_modulus,
+            poisson_ratio = EXCLUDED.poisson_ratio,
+            color = EXCLUDED.color,
+            description = EXCLUDED.description
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM upserted;
+$$;
+
+CREATE OR REPLACE FUNCTION upsert_tunnel_profile_config(payload JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH upserted AS (
+        INSERT INTO tunnel_profile_config (point_id, chainage_m, section_name, description)
+        SELECT r.point_id, r.chainage_m, r.section_name, r.description
+        FROM jsonb_to_recordset(payload) AS r(
+            point_id VARCHAR(20),
+            chainage_m NUMERIC,
+            section_name VARCHAR(100),
+            description TEXT
+        )
+        ON CONFLICT (point_id) DO UPDATE SET
+            chainage_m = EXCLUDED.chainage_m,
+            section_name = EXCLUDED.section_name,
+            description = EXCLUDED.description,
+            updated_at = NOW()
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM upserted;
+$$;
+
+CREATE OR REPLACE FUNCTION upsert_settlement_crack_mapping(payload JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH upserted AS (
+        INSERT INTO settlement_crack_mapping (
+            settlement_point, crack_point, distance_m, correlation_strength, notes
+        )
+        SELECT r.settlement_point, r.crack_point, r.distance_m, r.correlation_strength, r.notes
+        FROM jsonb_to_recordset(payload) AS r(
+            settlement_point VARCHAR(20),
+            crack_point VARCHAR(20),
+            distance_m NUMERIC,
+            correlation_strength VARCHAR(20),
+            notes TEXT
+        )
+        ON CONFLICT (settlement_point, crack_point) DO UPDATE SET
+            distance_m = EXCLUDED.distance_m,
+            correlation_strength = EXCLUDED.correlation_strength,
+            notes = EXCLUDED.notes
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM upserted;
+$$;
+
+GRANT EXECUTE ON FUNCTION upsert_geological_layers(JSONB) TO anon;
+GRANT EXECUTE ON FUNCTION upsert_tunnel_profile_config(JSONB) TO anon;
+GRANT EXECUTE ON FUNCTION upsert_settlement_crack_mapping(JSONB) TO anon;
+
+-- =====================================================
+-- Read helpers (profile_service.py)
+-- =====================================================
+
+-- All readings of the most recent measurement day, for the default
+-- profile view (one round trip instead of "find latest date" + query).
+CREATE OR REPLACE FUNCTION get_latest_day_profile()
+RETURNS SETOF processed_settlement_data
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT psd.*
+    FROM processed_settlement_data psd
+    WHERE psd.measurement_date >= (
+        SELECT date_trunc('day', MAX(measurement_date)) FROM processed_settlement_data
+    )
+    ORDER BY psd.point_id;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_latest_day_profile() TO anon;
+
+-- Distinct measurement days, so the date picker does not download every row
+CREATE OR REPLACE VIEW settlement_dates AS
+SELECT DISTINCT measurement_date::date AS d
+FROM processed_settlement_data
+WHERE measurement_date IS NOT NULL
+ORDER BY d;
+
+GRANT SELECT ON settlement_dates TO anon;
+
+-- =====================================================
+-- Read helpers (joint_service.py)
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_crack_data_point_date
+    ON crack_monitoring_data(point_id, measurement_date DESC);
+
+-- Latest n readings of each given crack point, newest first per point.
+-- Replaces one request per crack point when checking joint alerts.
+CREATE OR REPLACE FUNCTION get_latest_crack_readings(points TEXT[], n INTEGER DEFAULT 10)
+RETURNS SETOF crack_monitoring_data
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT c.*
+    FROM unnest(points) AS p(point_id)
+    CROSS JOIN LATERAL (
+        SELECT *
+        FROM crack_monitoring_data cmd
+        WHERE cmd.point_id = p.point_id
+        ORDER BY cmd.measurement_date DESC
+        LIMIT n
+    ) c
+    ORDER BY c.point_id, c.measurement_date DESC;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_latest_crack_readings(TEXT[], INTEGER) TO anon;
+
+-- Joint alerts: settlement points that are abnormal (alert level or rate)
+-- paired with related cracks whose latest 10 readings are widening.
+-- Mirrors JointAnalysisService._joint_alert_rows; severity and wording are
+-- added by the service.
+CREATE OR REPLACE FUNCTION get_joint_alerts(
+    s_thresh DOUBLE PRECISION DEFAULT 0.05,
+    c_thresh DOUBLE PRECISION DEFAULT 0.02
+)
+RETURNS TABLE (
+    settlement_point VARCHAR,
+    crack_point VARCHAR,
+    settlement_alert_level TEXT,
+    settlement_trend TEXT,
+    settlement_rate DOUBLE PRECISION,
+    crack_rate DOUBLE PRECISION
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH settlement AS (
+        SELECT
+            scm.settlement_point,
+            scm.crack_point,
+            COALESCE(NULLIF(sa.alert_level::TEXT, ''), 'normal') AS alert_level,
+            COALESCE(sa.trend_type::TEXT, '') AS trend_type,
+            ABS(COALESCE(sa.avg_daily_rate, 0))::DOUBLE PRECISION AS s_rate
+        FROM settlement_crack_mapping scm
+        LEFT JOIN settlement_analysis sa ON sa.point_id = scm.settlement_point
+    )
+    SELECT s.settlement_point, s.crack_point, s.alert_level, s.trend_type, s.s_rate, c.rate
+    FROM settlement s
+    CROSS JOIN LATERAL (
+        SELECT
+            COUNT(*) AS n,
+            ABS((ARRAY_AGG(r.value ORDER BY r.measurement_date DESC))[1]
+                - (ARRAY_AGG(r.value ORDER BY r.measurement_date DESC))[COUNT(*)]
+            )::DOUBLE PRECISION / NULLIF(COUNT(*), 0) AS rate
+        FROM (
+            SELECT cmd.value, cmd.measurement_date
+            FROM crack_monitoring_data cmd
+            WHERE cmd.point_id = s.crack_point
+            ORDER BY cmd.measurement_date DESC
+            LIMIT 10
+        ) r
+    ) c
+    WHERE NOT (s.alert_level = 'normal' AND s.s_rate < s_thresh)
+      AND c.n >= 2
+      AND c.rate > c_thresh
+    ORDER BY s.settlement_point, s.crack_point;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_joint_alerts(DOUBLE PRECISION, DOUBLE PRECISION) TO anon;
+
+-- Per-point aggregates for correlation analysis, so the service does not
+-- download whole histories to read a last value, a mean and a minimum.
+CREATE OR REPLACE VIEW settlement_point_stats AS
+SELECT
+    point_id,
+    ((ARRAY_AGG(cumulative_change ORDER BY measurement_date DESC)
+        FILTER (WHERE cumulative_change IS NOT NULL))[1])::DOUBLE PRECISION AS total_change,
+    AVG(daily_change)::DOUBLE PRECISION AS avg_daily_rate,
+    MIN(daily_change)::DOUBLE PRECISION AS max_daily_rate,  -- min because negative = settling
+    COUNT(*) AS n_readings
+FROM processed_settlement_data
+GROUP BY point_id;
+
+CREATE OR REPLACE VIEW crack_point_stats AS
+SELECT
+    point_id,
+    ((ARRAY_AGG(value ORDER BY measurement_date DESC))[1]
+        - (ARRAY_AGG(value ORDER BY measurement_date))[1])::DOUBLE PRECISION AS total_change,
+    COUNT(value) AS n_values
+FROM crack_monitoring_data
+GROUP BY point_id;
+
+GRANT SELECT ON settlement_point_stats TO anon;
+GRANT SELECT ON crack_point_stats TO anon;
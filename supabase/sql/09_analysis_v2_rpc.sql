@@ -0,0 +1,72 @@
+-- -*- coding: utf-8 -*-
+-- Supabase/PostgreSQL helpers for the analysis_v2 module
+-- Description: Read-side aggregates used by backend/modules/analysis_v2
+-- Depends on: processed_settlement_data
+
+-- =====================================================
+-- Settlement analysis (settlement_service.py)
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_processed_settlement_point_date
+    ON processed_settlement_data(point_id, measurement_date);
+
+-- One row per monitoring point with its series already ordered by date,
+-- so the service does not download every reading and group/sort them in
+-- Python. NULL values and daily changes are left out of their arrays,
+-- matching SettlementAnalysisService._compute_point_stats.
+CREATE OR REPLACE VIEW settlement_point_series AS
+SELECT
+    point_id,
+    COUNT(*) AS record_count,
+    MIN(measurement_date) AS first_seen,
+    MIN(measurement_date) FILTER (WHERE value IS NOT NULL) AS first_date,
+    MAX(measurement_date) FILTER (WHERE value IS NOT NULL) AS last_date,
+    array_agg(value::DOUBLE PRECISION ORDER BY measurement_date)
+        FILTER (WHERE value IS NOT NULL) AS vals,
+    array_agg(daily_change::DOUBLE PRECISION ORDER BY measurement_date)
+        FILTER (WHERE daily_change IS NOT NULL) AS daily_changes
+FROM processed_settlement_data
+WHERE point_id IS NOT NULL
+GROUP BY point_id;
+
+GRANT SELECT ON settlement_point_series TO anon;
+
+-- Data revision used as the cache key for per-point stats. A statement-level
+-- trigger bumps the counter on every write (including corrections of
+-- existing rows and TRUNCATE), so the service reads one row instead of
+-- scanning the table. updated_at keeps keys unique if the row is reset.
+DROP VIEW IF EXISTS settlement_data_revision;
+
+CREATE TABLE IF NOT EXISTS data_revisions (
+    table_name TEXT PRIMARY KEY,
+    revision BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO data_revisions (table_name)
+VALUES ('processed_settlement_data')
+ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_data_revision()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE data_revisions
+    SET revision = revision + 1, updated_at = NOW()
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS processed_settlement_data_revision ON processed_settlement_data;
+CREATE TRIGGER processed_settlement_data_revision
+    AFTER INSERT OR UPDATE OR DELETE ON processed_settlement_data
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_revision();
+
+DROP TRIGGER IF EXISTS processed_settlement_data_revision_truncate ON processed_settlement_data;
+CREATE TRIGGER processed_settlement_data_revision_truncate
+    AFTER TRUNCATE ON processed_settlement_data
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_revision();
+
+GRANT SELECT ON data_revisions TO anon;